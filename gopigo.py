@@ -5,10 +5,17 @@ from src.bots.gopigo.gopigo import *
 
 if __name__ == "__main__":
     program_file = input("Python file to emulate with GoPiGo emulator: ")
+    floor_file = input("Floor image (PGM, PPM or PNG at 1 mm per pixel, or tiled floor map, empty for none): ")
+    record_file = input("File to record the run to (empty for none): ")
 
-    pg = Playground(800, 800, "Playground")
+    pg = Playground(800, 800, "Playground", sim_clock=True, time_factor=1)
+    if floor_file:
+        pg.set_floor(Floor.load(floor_file))
 
     bot = GoPiGoBot(pg)
     bot.pen_offset = 105.5 # In mm
 
+    recorder = Recorder(pg, record_file) if record_file else None
     emulate(pg, bot, program_file)
+    if recorder is not None:
+        recorder.close()
@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+
+import argparse
+import json
+
+from src.bots.gopigo.batch import *
+
+
+# Parse "name=value,name=value" into a dict of floats
+def parse_params(text):
+    params = {}
+    for item in text.split(","):
+        name, value = item.split("=")
+        params[name.strip()] = float(value)
+    return params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emulate many GoPiGo programs headless, in parallel.")
+    parser.add_argument("programs", nargs="+", help="Python files to emulate")
+    parser.add_argument("--world", action="append", type=parse_params, help="Playground parameters, e.g. width=800,height=600,physics_rate=50")
+    parser.add_argument("--bot", action="append", type=parse_params, help="Bot parameters, e.g. wheel_diameter=66.5,pen_offset=100")
+    parser.add_argument("--time-limit", type=float, default=600, help="Simulated seconds after which a run is stopped")
+    parser.add_argument("--floor", default=None, help="Floor image of the playground (PGM, PPM or PNG at 1 mm per pixel)")
+    parser.add_argument("--record", default=None, metavar="DIR", help="Record every run to a file of this directory")
+    parser.add_argument("--events", action="store_true", help="Step from an event to the next instead of every tick")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes (default: number of cores)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = run_batch(make_jobs(args.programs, args.world, args.bot, args.time_limit, args.floor, args.record, args.events), args.workers)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            job = result["job"]
+            print("%s %s %s : %s%s" % (job["program"], job["world"], job["bot"], result["status"],
+                "" if result["error"] is None else " (%s)" % result["error"]))
+            print("    x = %.1f mm ; y = %.1f mm ; heading = %.3f rad ; encoders = (%.1f, %.1f)" % (
+                result["x"], result["y"], result["heading"], result["left_encoder"], result["right_encoder"]))
+            print("    sim time = %.2f s ; wall time = %.2f s" % (result["sim_time"], result["wall_time"]))
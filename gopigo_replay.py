@@ -0,0 +1,33 @@
+#!/usr/bin/python3
+
+import argparse
+
+from src.emu import *
+from src.bots.gopigo.gopigo import *
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded GoPiGo run.")
+    parser.add_argument("recording", help="File recorded by gopigo.py or gopigo_batch.py --record")
+    parser.add_argument("--speed", type=float, default=1, help="Replay speed, 0 for as fast as possible")
+    parser.add_argument("--start", type=float, default=0, help="Time in seconds to start the replay at")
+    parser.add_argument("--floor", default=None, help="Floor image of the playground")
+    args = parser.parse_args()
+
+    recording = Recording(args.recording)
+
+    # The replay only moves the bots, so it is stepped at the display rate
+    pg = Playground(800, 800, "Replay", physics_rate=60, sim_clock=True, time_factor=args.speed or None)
+    if args.floor:
+        pg.set_floor(Floor.load(args.floor))
+
+    bots = []
+    for name in recording.bots:
+        bot = GoPiGoBot(pg, name)
+        bot.pen_offset = 105.5 # In mm
+        bot.update_shape()
+        bots.append(bot)
+
+    replay = Replay(pg, recording, bots)
+    replay.seek(args.start)
+    pg.mainloop()
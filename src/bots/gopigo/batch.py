@@ -0,0 +1,111 @@
+import contextlib
+import io
+import itertools
+import multiprocessing
+import os
+import time
+
+from .gopigo import *
+
+
+# Default parameters of the playground a batch job runs in
+DEFAULT_WORLD = {"width": 800, "height": 800, "scale": 1.04, "physics_rate": None}
+
+
+def make_jobs(programs, worlds=None, bot_params=None, time_limit: float = 600, floor: str = None, record_dir: str = None, event_driven: bool = False) -> list:
+    """
+    Build the list of jobs running every program in every world with every set of bot parameters.
+
+    A world is a dict of Playground arguments (width, height, scale, physics_rate, the ticks per
+    simulated second, the playground default when None) and a set of bot parameters
+    is a dict of GoPiGoBot attributes (wheel_diameter, wheels_distance, pen_offset...).
+    time_limit is the simulated time in seconds after which a run is stopped and floor the path of
+    the floor image (1 mm per pixel) of the playground, None for a white floor. When record_dir is
+    given, every run is recorded to a numbered file of this directory. With event_driven, the
+    playgrounds step from an event to the next instead of every tick (see Playground.next_event).
+    """
+    jobs = []
+    floor = None if floor is None else os.path.abspath(floor)
+    for program, world, bot in itertools.product(programs, worlds or [{}], bot_params or [{}]):
+        jobs.append({"program": os.path.abspath(program), "world": dict(world), "bot": dict(bot), "time_limit": time_limit, "floor": floor, "record": None, "event_driven": event_driven})
+    if record_dir is not None:
+        os.makedirs(record_dir, exist_ok=True)
+        for i, job in enumerate(jobs):
+            name = "%03i_%s.rec" % (i, os.path.splitext(os.path.basename(job["program"]))[0])
+            job["record"] = os.path.abspath(os.path.join(record_dir, name))
+    return jobs
+
+
+def run_job(job: dict) -> dict:
+    """
+    Run one job headless with the simulation clock and return its result.
+
+    The result holds the job, the exit status ("ok", "exit", "error" or "timeout"), the error
+    message, the final pose (x, y in mm and heading in radians), the encoders of both motors in
+    degrees, the simulated time, the wall time and everything the program printed (including
+    the traceback of an error).
+    """
+    world = dict(DEFAULT_WORLD)
+    world.update(job.get("world", {}))
+
+    start = time.perf_counter()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        pg = Playground(world["width"], world["height"], "Playground", world["scale"], headless=True,
+                        physics_rate=world["physics_rate"], sim_clock=True)
+        pg.time_limit = job.get("time_limit")
+        pg.event_driven = job.get("event_driven", False)
+        if job.get("floor"):
+            pg.set_floor(Floor.load(job["floor"]))
+
+        bot = GoPiGoBot(pg)
+        bot.pen_offset = 105.5 # In mm
+        for name, value in job.get("bot", {}).items():
+            setattr(bot, name, value)
+
+        recorder = Recorder(pg, job["record"]) if job.get("record") else None
+        emulate(pg, bot, job["program"])
+        if recorder is not None:
+            recorder.close()
+
+        timeout = pg.time_limit is not None and pg.sim_time >= pg.time_limit
+        if not timeout:
+            bot.user_thread.join() # The program returned, wait for its thread to record how
+    wall_time = time.perf_counter() - start
+
+    error = None
+    if timeout and bot.user_thread.is_alive():
+        status = "timeout"
+    elif bot.user_exit is None:
+        status = "ok"
+    elif isinstance(bot.user_exit, SystemExit):
+        status = "ok" if bot.user_exit.code in (None, 0) else "exit"
+        error = None if status == "ok" else str(bot.user_exit.code)
+    else:
+        status = "error"
+        error = "%s: %s" % (type(bot.user_exit).__name__, bot.user_exit)
+
+    return {
+        "job": job,
+        "status": status,
+        "error": error,
+        "x": bot.x,
+        "y": bot.y,
+        "heading": bot.heading,
+        "left_encoder": bot.left_motor.encoder,
+        "right_encoder": bot.right_motor.encoder,
+        "sim_time": pg.sim_time,
+        "wall_time": wall_time,
+        "output": output.getvalue(),
+    }
+
+
+def run_batch(jobs: list, max_workers: int = None) -> list:
+    """
+    Run the jobs over a pool of processes and return their results in the same order.
+
+    Every job runs in a fresh process so the programs can not interfere with each other.
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(max_workers, maxtasksperchild=1) as pool:
+        return pool.map(run_job, jobs, chunksize=1) # One job per task, so per process
@@ -0,0 +1,373 @@
+import numpy as np
+
+from .gopigo import *
+
+
+class GoPiGoFleet:
+    """
+    Vectorized engine stepping the motors and the kinematics of many GoPiGo bots at once.
+
+    The state of every bot of the fleet is stored in NumPy arrays (structure of arrays) and
+    advanced by a single batched call per tick. Bots created with add_bot are FleetGoPiGoBot
+    objects whose position and motors are views into these arrays, so the GoPiGo libraries
+    and user programs use them like any other GoPiGoBot.
+    """
+
+    def __init__(self, playground: Playground, capacity: int = 16) -> None:
+        self.playground = playground
+        self.bots = []
+        self.size = 0
+        self.capacity = 0
+
+        # Bot state
+        self.x = None
+        self.y = None
+        self.heading = None
+        self.wheel_diameter = None
+        self.wheels_distance = None
+
+        # Motor state, one column per motor (0 = left, 1 = right)
+        self.encoder = None
+        self.limit = None
+        self.speed = None
+        self.target = None
+        self.has_target = None
+        self.accel = None
+        self.decel = None
+        self.velocity = None
+        self.setpoint = None
+        self.setpoint_velocity = None
+
+        # PID loop state and parameters, one column per motor
+        self.pid_enabled = None
+        self.kp = None
+        self.ki = None
+        self.kd = None
+        self.max_speed = None
+        self.time_constant = None
+        self.overload_error = None
+        self.power = None
+        self.integral = None
+        self.last_error = None
+        self.control_timer = None
+        self.overloaded = None
+        self.open_loop = None
+        self.cruising = None
+
+        self._grow(capacity)
+        playground.register_engine(self)
+
+    def _grow(self, capacity: int) -> None:
+        def grow(array, shape, dtype=np.float64):
+            new_array = np.zeros(shape, dtype=dtype)
+            if array is not None:
+                new_array[:self.size] = array[:self.size]
+            return new_array
+
+        self.x               = grow(self.x, capacity)
+        self.y               = grow(self.y, capacity)
+        self.heading         = grow(self.heading, capacity)
+        self.wheel_diameter  = grow(self.wheel_diameter, capacity)
+        self.wheels_distance = grow(self.wheels_distance, capacity)
+
+        self.encoder    = grow(self.encoder, (capacity, 2))
+        self.limit      = grow(self.limit, (capacity, 2))
+        self.speed      = grow(self.speed, (capacity, 2))
+        self.target     = grow(self.target, (capacity, 2))
+        self.has_target = grow(self.has_target, (capacity, 2), np.bool_)
+        self.accel      = grow(self.accel, (capacity, 2))
+        self.decel      = grow(self.decel, (capacity, 2))
+        self.velocity   = grow(self.velocity, (capacity, 2))
+        self.setpoint          = grow(self.setpoint, (capacity, 2))
+        self.setpoint_velocity = grow(self.setpoint_velocity, (capacity, 2))
+
+        self.pid_enabled    = grow(self.pid_enabled, (capacity, 2), np.bool_)
+        self.kp             = grow(self.kp, (capacity, 2))
+        self.ki             = grow(self.ki, (capacity, 2))
+        self.kd             = grow(self.kd, (capacity, 2))
+        self.max_speed      = grow(self.max_speed, (capacity, 2))
+        self.time_constant  = grow(self.time_constant, (capacity, 2))
+        self.overload_error = grow(self.overload_error, (capacity, 2))
+        self.power          = grow(self.power, (capacity, 2))
+        self.integral       = grow(self.integral, (capacity, 2))
+        self.last_error     = grow(self.last_error, (capacity, 2))
+        self.control_timer  = grow(self.control_timer, (capacity, 2))
+        self.overloaded     = grow(self.overloaded, (capacity, 2), np.bool_)
+        self.open_loop      = grow(self.open_loop, (capacity, 2), np.bool_)
+        self.cruising       = grow(self.cruising, (capacity, 2), np.bool_)
+
+        self.capacity = capacity
+
+    def _allocate(self) -> int:
+        if self.size == self.capacity:
+            self._grow(max(1, self.capacity * 2))
+        self.size += 1
+        return self.size - 1
+
+    def add_bot(self, name: str = "GoPiGo Bot"):
+        bot = FleetGoPiGoBot(self, self._allocate(), name)
+        self.bots.append(bot)
+        return bot
+
+    # Same as GoPiGoMotor._phase, for every motor of the fleet
+    def _phases(self):
+        n = self.size
+        v      = self.setpoint_velocity[:n]
+        limit  = self.limit[:n]
+        accel  = self.accel[:n]
+        decel  = self.decel[:n]
+        target = self.target[:n]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Speed mode
+            desired = np.clip(self.speed[:n], -limit, limit)
+            steady = v == desired
+            reverse = v * desired < 0
+            slower = reverse | (np.abs(desired) < np.abs(v))
+            speed_end = np.where(reverse, 0, desired)
+            rate = np.where(slower, decel, accel)
+            speed_a = np.where(steady, 0, np.where(speed_end > v, rate, -rate))
+            speed_duration = np.where(steady, np.inf, np.abs(speed_end - v) / rate)
+            speed_end = np.where(steady, v, speed_end)
+
+            # Position mode
+            distance = target - self.setpoint[:n]
+            sign = np.where(distance != 0, np.sign(distance), np.where(v < 0, 1, -1))
+            u = v * sign
+            d = np.abs(distance)
+            idle = ((distance == 0) & (v == 0)) | ((u == limit) & (u == 0))
+            away = u < 0
+            brake = (u > 0) & (u * u / (2 * decel) >= d - 1e-9)
+            over = u > limit
+            cruise = u == limit
+            t_limit = (limit - u) / accel
+            qa = accel * accel / (2 * decel) + accel / 2
+            qb = u * accel / decel + u
+            qc = u * u / (2 * decel) - d
+            t_brake = (-qb + np.sqrt(np.maximum(qb * qb - 4 * qa * qc, 0))) / (2 * qa)
+            accelerate_end = np.where(t_brake < t_limit, sign * (u + accel * t_brake), sign * limit)
+
+            conditions = [idle, away, brake, over, cruise]
+            position_a = np.select(conditions, [0, sign * decel, -sign * u * u / (2 * d), -sign * decel, 0], sign * accel)
+            position_duration = np.select(conditions,
+                [np.inf, -u / decel, 2 * d / u, (u - limit) / decel, (d - u * u / (2 * decel)) / u],
+                np.minimum(t_limit, t_brake))
+            position_end = np.select(conditions, [0, 0, 0, sign * limit, v], accelerate_end)
+            on_target = brake & ~idle & ~away
+
+        has_target = self.has_target[:n]
+        return (np.where(has_target, position_a, speed_a),
+                np.where(has_target, position_duration, speed_duration),
+                np.where(has_target, position_end, speed_end),
+                has_target & on_target)
+
+    # Same as GoPiGoMotor._resting, for every motor of the fleet
+    def _resting(self, phases) -> np.ndarray:
+        n = self.size
+        return ((phases[1] == np.inf) & (self.setpoint_velocity[:n] == 0) &
+                (self.velocity[:n] == 0) & (self.power[:n] == 0))
+
+    # Same as GoPiGoMotor.next_event, for every motor of the fleet
+    def _next_events(self, phases) -> np.ndarray:
+        n = self.size
+        a, duration, _, _ = phases
+        duration = np.where(a != 0, np.minimum(duration, GoPiGoMotor.RAMP_STEP), duration)
+        pid = self.pid_enabled[:n] & ~self._resting(phases) & ~(self.cruising[:n] & (a == 0))
+        duration = np.where(pid, np.minimum(duration, self.control_timer[:n]), duration)
+        settled = np.abs(self.velocity[:n] - self.power[:n] / 100 * self.max_speed[:n]) <= 0.5
+        return np.where(self.open_loop[:n], np.where(settled, np.inf, GoPiGoMotor.RAMP_STEP), duration)
+
+    # Same motor model as GoPiGoMotor.advance, for every motor of the fleet, with a step per bot
+    def _advance_motors(self, delta_time: np.ndarray, phases) -> np.ndarray:
+        n = self.size
+        encoder = self.encoder[:n]
+        velocity = self.velocity[:n]
+        setpoint = self.setpoint[:n]
+        v = self.setpoint_velocity[:n]
+        open_loop = self.open_loop[:n]
+        pid = self.pid_enabled[:n] & ~open_loop
+        respond = pid | open_loop # The speed follows the power
+        a, duration, end_velocity, on_target = phases
+
+        delta_time = delta_time[:, None]
+        ended = delta_time >= duration
+        step = np.minimum(delta_time, duration)
+        setpoint[:] = np.where(ended & on_target, self.target[:n], setpoint + (v + a * step / 2) * step)
+        v[:] = np.where(ended, end_velocity, v + a * step)
+
+        # The speed tends exponentially toward the speed of the power
+        power_speed = self.power[:n] / 100 * self.max_speed[:n]
+        tau = self.time_constant[:n]
+        decay = np.exp(-delta_time / tau)
+        delta_rotate = np.where(respond, power_speed * delta_time + (velocity - power_speed) * tau * (1 - decay), setpoint - encoder)
+        encoder[:] = np.where(respond, encoder + delta_rotate, setpoint)
+        velocity[:] = np.where(respond, power_speed + (velocity - power_speed) * decay, v)
+        setpoint[:] = np.where(open_loop, encoder, setpoint)
+
+        control_timer = self.control_timer[:n]
+        pid &= ~(self.cruising[:n] & (a == 0))
+        control_timer -= np.where(pid, delta_time, 0)
+        due = pid & (control_timer <= 0)
+        if due.any():
+            self._control(due)
+        return delta_rotate
+
+    # Same as GoPiGoMotor._control, for the motors whose PID loop is due
+    def _control(self, due: np.ndarray) -> None:
+        n = self.size
+        period = GoPiGoMotor.CONTROL_PERIOD
+        velocity = self.velocity[:n]
+        power = self.power[:n]
+        integral = self.integral[:n]
+        last_error = self.last_error[:n]
+        v = self.setpoint_velocity[:n]
+        self.control_timer[:n][due] = period
+
+        error = self.setpoint[:n] - self.encoder[:n]
+        self.overloaded[:n] = np.where(due, np.abs(error) > self.overload_error[:n], self.overloaded[:n])
+        a, duration, _, _ = self._phases()
+        settled = due & (np.abs(error) < GoPiGoMotor.SETTLED_ERROR)
+        rest = settled & (np.abs(velocity) < GoPiGoMotor.SETTLED_SPEED) & (v == 0) & (duration == np.inf)
+        cruise = settled & ~rest & (np.abs(velocity - v) < GoPiGoMotor.SETTLED_SPEED) & (a == 0)
+        run = due & ~rest & ~cruise
+        self.cruising[:n] = np.where(due, cruise, self.cruising[:n])
+        self.control_timer[:n][cruise] = 0
+
+        derivative = (error - last_error) / period
+        new_power = (v / self.max_speed[:n] * 100 + self.kp[:n] * error +
+                     self.ki[:n] * integral + self.kd[:n] * derivative)
+        clipped = np.clip(new_power, -100, 100)
+        integral[:] = np.where(run & (clipped == new_power), integral + error * period, np.where(rest | cruise, 0, integral))
+        power[:] = np.where(run, clipped, np.where(rest, 0, np.where(cruise, v / self.max_speed[:n] * 100, power)))
+        velocity[:] = np.where(rest, 0, np.where(cruise, v, velocity))
+        last_error[:] = np.where(due, error, last_error)
+
+    # Same kinematics as TwoWheelsBot.add_wheel_delta, for every bot of the fleet
+    def _add_wheel_delta(self, delta_rotate: np.ndarray) -> None:
+        n = self.size
+        left_delta  = delta_rotate[:, 0]
+        right_delta = delta_rotate[:, 1]
+        wheel_diameter = self.wheel_diameter[:n]
+        heading = self.heading[:n]
+
+        k = ((right_delta - left_delta) * np.pi * wheel_diameter / 360) / self.wheels_distance[:n]
+        s = ((right_delta + left_delta) * np.pi * wheel_diameter / 360) / 2
+
+        turning = k != 0
+        half_k = np.where(turning, k / 2, 1)
+        chord = np.where(turning, s * np.sin(half_k) / half_k, s)
+        middle = heading + k / 2
+
+        if not self.playground.renderer.headless:
+            start = (self.x[:n].copy(), self.y[:n].copy(), heading.copy())
+        self.x[:n] += chord * np.cos(middle)
+        self.y[:n] += chord * np.sin(middle)
+        heading += k
+
+        if not self.playground.renderer.headless:
+            x, y, start_heading = start
+            for i in np.flatnonzero((left_delta != 0) | (right_delta != 0)):
+                self.bots[i].add_trail_arc(float(x[i]), float(y[i]), float(start_heading[i]), float(s[i]), float(k[i]))
+
+    def next_event(self) -> float:
+        if self.size == 0: return np.inf
+        return min(float(self._next_events(self._phases()).min()), min(bot.devices_next_event() for bot in self.bots))
+
+    def update(self, delta_time: float) -> None:
+        if self.size == 0: return
+        # Split the step of every bot where one of its motors changes its speed, as GoPiGoBot.update
+        remaining = np.full(self.size, float(delta_time))
+        while True:
+            phases = self._phases()
+            step = np.minimum(remaining, self._next_events(phases).min(axis=1))
+            self._add_wheel_delta(self._advance_motors(step, phases))
+            remaining -= step
+            if not remaining.any(): break
+        for bot in self.bots:
+            bot.update_devices(delta_time)
+
+
+class _FleetField:
+    """Descriptor exposing one element of a fleet array as an attribute."""
+
+    def __init__(self, name: str, column: bool = False) -> None:
+        self.name = name
+        self.column = column
+
+    def _index(self, obj):
+        return (obj.index, obj.side) if self.column else obj.index
+
+    def __get__(self, obj, owner=None):
+        if obj is None: return self
+        return float(getattr(obj.fleet, self.name)[self._index(obj)])
+
+    def __set__(self, obj, value) -> None:
+        getattr(obj.fleet, self.name)[self._index(obj)] = value
+
+
+class FleetGoPiGoMotor(GoPiGoMotor):
+    """GoPiGoMotor whose state is stored in the arrays of a GoPiGoFleet."""
+
+    encoder  = _FleetField("encoder", True)
+    limit    = _FleetField("limit", True)
+    speed    = _FleetField("speed", True)
+    accel    = _FleetField("accel", True)
+    decel    = _FleetField("decel", True)
+    velocity = _FleetField("velocity", True)
+    setpoint          = _FleetField("setpoint", True)
+    setpoint_velocity = _FleetField("setpoint_velocity", True)
+
+    pid_enabled    = _FleetField("pid_enabled", True)
+    kp             = _FleetField("kp", True)
+    ki             = _FleetField("ki", True)
+    kd             = _FleetField("kd", True)
+    max_speed      = _FleetField("max_speed", True)
+    time_constant  = _FleetField("time_constant", True)
+    overload_error = _FleetField("overload_error", True)
+    power          = _FleetField("power", True)
+    integral       = _FleetField("integral", True)
+    last_error     = _FleetField("last_error", True)
+    control_timer  = _FleetField("control_timer", True)
+    overloaded     = _FleetField("overloaded", True)
+    open_loop      = _FleetField("open_loop", True)
+    cruising       = _FleetField("cruising", True)
+
+    def __init__(self, fleet: GoPiGoFleet, index: int, side: int) -> None:
+        self.fleet = fleet
+        self.index = index
+        self.side = side
+        super().__init__()
+
+    @property
+    def target(self):
+        if not self.fleet.has_target[self.index, self.side]: return None
+        return float(self.fleet.target[self.index, self.side])
+
+    @target.setter
+    def target(self, value) -> None:
+        self.fleet.has_target[self.index, self.side] = value is not None
+        self.fleet.target[self.index, self.side] = 0 if value is None else value
+
+
+class FleetGoPiGoBot(GoPiGoBot):
+    """GoPiGoBot whose pose and motors are views into the arrays of a GoPiGoFleet."""
+
+    x               = _FleetField("x")
+    y               = _FleetField("y")
+    heading         = _FleetField("heading")
+    wheel_diameter  = _FleetField("wheel_diameter")
+    wheels_distance = _FleetField("wheels_distance")
+
+    def __init__(self, fleet: GoPiGoFleet, index: int, name: str = "GoPiGo Bot") -> None:
+        self.fleet = fleet
+        self.index = index
+        super().__init__(fleet.playground, name)
+
+    def create_motor(self, side: int) -> GoPiGoMotor:
+        return FleetGoPiGoMotor(self.fleet, self.index, side)
+
+    def update(self, delta_time: float):
+        pass # Stepped by the fleet
+
+    def next_event(self) -> float:
+        return np.inf # Given by the fleet
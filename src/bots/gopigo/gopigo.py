@@ -1,41 +1,295 @@
+from math import exp, inf, log, sqrt
+
 from ...emu import *
 
+try:
+    import numpy as np
+    numpy_available = True
+except ImportError:
+    numpy_available = False
+
 
 class GoPiGoMotor:
+    """
+    Motor of a wheel, driven like the GoPiGo3 firmware does.
+
+    The commands move a setpoint along a trapezoidal velocity profile. In speed mode (set_dps) its
+    velocity ramps to the requested speed at accel degrees/s^2, or at decel degrees/s^2 when it
+    slows down. In position mode (set_position) it accelerates up to limit, cruises and decelerates
+    at decel to stop exactly on the target. The profile is made of phases of constant acceleration
+    solved in closed form.
+
+    Every CONTROL_PERIOD seconds, a PID loop (with the profile velocity as feedforward) sets the
+    power that makes the encoder follow the setpoint. In between, the motor speed tends toward the
+    speed of its power with time_constant, also solved in closed form, so a step gives the same
+    encoder whatever its length. The motor is overloaded when it is more than overload_error
+    degrees away from its setpoint, e.g. when asked to go faster than max_speed. It stops once close
+    enough to a setpoint at rest, and holds the speed of a setpoint cruising at constant speed once
+    close enough to it: the PID loop then has no events until the profile changes its acceleration.
+    With pid_enabled False, the encoder follows the profile exactly.
+
+    set_power drives the motor open loop: the power is fixed, the profile and the PID loop are idle
+    and the setpoint follows the encoder, until set_dps or set_position closes the loop again.
+
+    During a ramp, or while the speed of an open loop motor changes, next_event is at most RAMP_STEP
+    away, so the bot pose follows the changing wheel speeds closely.
+
+    A program waiting for the encoder to read a value between two bounds can watch that window:
+    next_watch_event then gives the exact time the reading enters it.
+    """
+
+    RAMP_STEP = 0.0025 # In seconds
+    CONTROL_PERIOD = 0.01 # In seconds
+    OVERLOADED = 0x02 # Flag of get_status
+    SETTLED_ERROR = 0.5 # In degrees, half an encoder step so the encoder reads its setpoint
+    SETTLED_SPEED = 0.5 # In degrees / s
+
     def __init__(self) -> None:
         self.encoder = 0
         self.limit = 0
         self.speed = 0
         self.target = None
-        self.accel = 5400
+        self.accel = 5400 # In degrees / s^2
         self.decel = 5800
         self.velocity = 0
 
-    def _target_reached(self, precision: float = 2):
-        return abs(self.encoder - self.target) <= precision
+        # Position and velocity the motor is driven to
+        self.setpoint = 0
+        self.setpoint_velocity = 0
+
+        self.pid_enabled = True
+        self.kp = 6    # In % of power / degree
+        self.ki = 10   # In % of power / (degree.s)
+        self.kd = 0.04 # In % of power / (degree/s)
+        self.max_speed = 500 # Speed in degrees / s at full power
+        self.time_constant = 0.02 # In seconds
+        self.overload_error = 10 # In degrees
+        self.power = 0 # In %, from -100 to 100
+        self.integral = 0
+        self.last_error = 0
+        self.control_timer = 0 # Time in seconds until the next run of the PID loop
+        self.overloaded = False
+        self.open_loop = False # True when driven at a fixed power by set_power
+        self.cruising = False # True when holding the speed of the setpoint, while the profile does not accelerate
+        self.watches = [] # (low, high) windows of the encoder reading waited for, bounds excluded
+
+    # Current phase of the profile: acceleration, duration, velocity at its end and whether it ends on the target
+    def _phase(self):
+        v = self.setpoint_velocity
+        limit = self.limit
+        if self.target is None:
+            desired = min(max(self.speed, -limit), limit)
+            if v == desired:
+                return 0, inf, v, False
+            if v * desired < 0 or abs(desired) < abs(v):
+                end = 0 if v * desired < 0 else desired # Stop before turning the other way
+                return (self.decel if end > v else -self.decel), abs(end - v) / self.decel, end, False
+            return (self.accel if desired > v else -self.accel), abs(desired - v) / self.accel, desired, False
+
+        distance = self.target - self.setpoint
+        if distance == 0 and v == 0:
+            return 0, inf, 0, False
+        # Speed toward the target and remaining distance
+        sign = (1 if distance > 0 else -1) if distance != 0 else (1 if v < 0 else -1)
+        u = v * sign
+        d = abs(distance)
+        decel = self.decel
+        if u < 0: # Going away from the target
+            return sign * decel, -u / decel, 0, False
+        if u > 0 and u * u / (2 * decel) >= d - 1e-9: # Braking distance reached
+            return -sign * u * u / (2 * d), 2 * d / u, 0, True
+        if u > limit:
+            return -sign * decel, (u - limit) / decel, sign * limit, False
+        if u == limit:
+            if u == 0: return 0, inf, 0, False
+            return 0, (d - u * u / (2 * decel)) / u, v, False
+
+        # Accelerate until the limit, or until the braking distance is reached:
+        # (u + a t)^2 / (2 decel) = d - u t - a t^2 / 2
+        a = self.accel
+        t_limit = (limit - u) / a
+        qa = a * a / (2 * decel) + a / 2
+        qb = u * a / decel + u
+        qc = u * u / (2 * decel) - d
+        t_brake = (-qb + sqrt(qb * qb - 4 * qa * qc)) / (2 * qa)
+        if t_brake < t_limit:
+            return sign * a, t_brake, sign * (u + a * t_brake), False
+        return sign * a, t_limit, sign * limit, False
+
+    # Whether the setpoint and the motor are at rest, the PID loop is then idle
+    def _resting(self, phase) -> bool:
+        return phase[1] == inf and self.setpoint_velocity == 0 and self.velocity == 0 and self.power == 0
+
+    def next_event(self) -> float:
+        """Time in seconds until the motor changes its acceleration by itself (inf if it never does)."""
+        if self.open_loop:
+            settled = abs(self.velocity - self.power / 100 * self.max_speed) <= 0.5
+            return inf if settled else self.RAMP_STEP
+        phase = self._phase()
+        a, duration, _, _ = phase
+        if a != 0:
+            duration = min(duration, self.RAMP_STEP)
+        if self.pid_enabled and not self._resting(phase) and not (self.cruising and a == 0):
+            duration = min(duration, self.control_timer)
+        return duration
+
+    # Rotate for delta_time seconds, at most up to the next event, and return delta degrees
+    def advance(self, delta_time: float) -> float:
+        if self.open_loop:
+            delta_rotate = self._respond(delta_time)
+            self.setpoint = self.encoder
+            return delta_rotate
+
+        phase = self._phase()
+        a, duration, end_velocity, _ = phase
+        cruising = self.cruising and a == 0
+        v = self.setpoint_velocity
+        self.setpoint = self._setpoint_at(delta_time, phase)
+        self.setpoint_velocity = v + a * delta_time if delta_time < duration else end_velocity
+
+        if not self.pid_enabled:
+            delta_rotate = self.setpoint - self.encoder
+            self.encoder = self.setpoint
+            self.velocity = self.setpoint_velocity
+            return delta_rotate
+
+        delta_rotate = self._respond(delta_time)
+        if cruising: return delta_rotate
+        self.control_timer -= delta_time
+        if self.control_timer <= 0:
+            self._control()
+        return delta_rotate
 
-    def _update_velocity(self, desired_speed: float, delta_time: float):
-        a = self.accel if abs(self.velocity) < abs(desired_speed) else self.decel
-        if self.velocity < desired_speed:
-            self.velocity = min(self.velocity + a * delta_time, desired_speed)
-        elif self.velocity > desired_speed:
-            self.velocity = max(self.velocity - a * delta_time, desired_speed)
-        self.velocity = desired_speed
+    # Setpoint after delta_time seconds of a phase, at most up to its end
+    def _setpoint_at(self, delta_time: float, phase) -> float:
+        a, duration, _, on_target = phase
+        v = self.setpoint_velocity
+        if delta_time < duration:
+            return self.setpoint + (v + a * delta_time / 2) * delta_time
+        return self.target if on_target else self.setpoint + (v + a * duration / 2) * duration # End of the phase
+
+    # The speed tends exponentially toward the speed of the power, return delta degrees and the new speed
+    def _response(self, delta_time: float) -> tuple:
+        power_speed = self.power / 100 * self.max_speed
+        tau = self.time_constant
+        decay = exp(-delta_time / tau)
+        delta_rotate = power_speed * delta_time + (self.velocity - power_speed) * tau * (1 - decay)
+        return delta_rotate, power_speed + (self.velocity - power_speed) * decay
+
+    def _respond(self, delta_time: float) -> float:
+        delta_rotate, self.velocity = self._response(delta_time)
+        self.encoder += delta_rotate
+        return delta_rotate
 
-    # Update motor rotation and return delta degrees
-    def update(self, delta_time: float) -> float:
-        if self.target is None:
-            desired_speed = min(max(self.speed, -self.limit), self.limit)
-        elif not self._target_reached():
-            desired_speed = self.limit * (1 if self.target > self.encoder else -1)
+    # Encoder after delta_time seconds, at most up to the next event, computed as advance does
+    def _encoder_at(self, delta_time: float, phase) -> float:
+        if self.open_loop or self.pid_enabled:
+            return self.encoder + self._response(delta_time)[0]
+        return self._setpoint_at(delta_time, phase)
+
+    def watch(self, low: float, high: float) -> None:
+        self.watches.append((low, high))
+
+    def unwatch(self, low: float, high: float) -> None:
+        if (low, high) in self.watches:
+            self.watches.remove((low, high))
+
+    def next_watch_event(self, horizon: float) -> float:
+        """
+        Time in seconds until the encoder reading enters a watched window, at most horizon and the
+        next event (inf without watches).
+        """
+        if not self.watches: return inf
+        if self.next_event() <= 0:
+            self.advance(0) # Run the PID loop due now, as the next update would, its power sets the motion
+        horizon = min(horizon, self.next_event())
+        phase = None if self.open_loop else self._phase()
+
+        # The speed changes its sign at most once before the next event, the encoder is monotonic on each side
+        if self.open_loop or self.pid_enabled:
+            v = self.velocity
+            power_speed = self.power / 100 * self.max_speed
+            turn = self.time_constant * log((v - power_speed) / -power_speed) if v * power_speed < 0 else inf
         else:
-            desired_speed = 0
-        self._update_velocity(desired_speed, delta_time)
-        delta_rotate = self.velocity * delta_time
-        self.encoder += delta_rotate
+            v = self.setpoint_velocity
+            a = phase[0]
+            turn = -v / a if v * a < 0 else inf
+        ends = [turn, horizon] if turn < horizon else [horizon]
+
+        reading_at = lambda t: int(self._encoder_at(t, phase) + 0.5) # As get_encoder
+        event = horizon
+        for low, high in self.watches:
+            reading = self.get_encoder()
+            if low < reading < high: continue
+            entered = (lambda r: r > low) if reading <= low else (lambda r: r < high)
+            start = 0
+            for end in ends:
+                if end > event: break
+                if entered(reading_at(end)):
+                    # Bisect for the first time the reading is in the window
+                    while True:
+                        middle = (start + end) / 2
+                        if middle <= start or middle >= end or end - start < 1e-9: break
+                        if entered(reading_at(middle)):
+                            end = middle
+                        else:
+                            start = middle
+                    event = end
+                    break
+                start = end
+        return event
+
+    # One run of the PID loop
+    def _control(self) -> None:
+        period = self.CONTROL_PERIOD
+        self.control_timer = period
+        error = self.setpoint - self.encoder
+        self.overloaded = abs(error) > self.overload_error
+        self.cruising = False
+        a, duration, _, _ = self._phase()
+        settled = abs(error) < self.SETTLED_ERROR
+        if settled and abs(self.velocity) < self.SETTLED_SPEED and self.setpoint_velocity == 0 and duration == inf:
+            # Close enough to a setpoint at rest, stop until it moves
+            self.power = 0
+            self.velocity = 0
+            self.integral = 0
+            self.last_error = error
+            return
+        if settled and abs(self.velocity - self.setpoint_velocity) < self.SETTLED_SPEED and a == 0:
+            # Close enough to a setpoint cruising at constant speed, hold its speed until the profile accelerates
+            self.cruising = True
+            self.power = self.setpoint_velocity / self.max_speed * 100
+            self.velocity = self.setpoint_velocity
+            self.integral = 0
+            self.last_error = error
+            self.control_timer = 0 # The loop runs again as soon as the profile accelerates
+            return
+        derivative = (error - self.last_error) / period
+        self.last_error = error
+        power = self.setpoint_velocity / self.max_speed * 100 + self.kp * error + self.ki * self.integral + self.kd * derivative
+        self.power = min(max(power, -100), 100)
+        if self.power == power:
+            self.integral += error * period # Not while saturated, so the integral does not wind up
+
+    # Update motor rotation and return delta degrees, exact whatever the length of the step
+    def update(self, delta_time: float) -> float:
+        delta_rotate = 0
+        while delta_time > 0:
+            step = min(delta_time, self.next_event())
+            delta_rotate += self.advance(step)
+            delta_time -= step
         return delta_rotate
 
+    def get_status(self) -> list:
+        """Flags (OVERLOADED), power in %, encoder and speed in degrees / s, as GoPiGo3.get_motor_status."""
+        if self.pid_enabled or self.open_loop:
+            power = self.power
+        else:
+            power = min(max(self.setpoint_velocity / self.max_speed * 100, -100), 100)
+        return [self.OVERLOADED if self.overloaded else 0, int(round(power)), self.get_encoder(), int(round(self.velocity))]
+
     def set_position(self, degrees: float) -> None:
+        self._close_loop()
         self.target = degrees
         self.speed = 0
 
@@ -46,21 +300,39 @@ class GoPiGoMotor:
         if dps < 0: dps = -dps #print("Error (GoPiGoMotor.set_limits) : dps is negative")
         self.limit = dps
 
+    # Power in % from -100 to 100, -128 lets the motor float
     def set_power(self, power: int) -> None:
-        if power == -128:
-            self.set_dps(0)
-        else:
-            self.set_dps(power / 127 * 500) # TODO : Don't hard code 500
+        self.open_loop = True
+        self.power = 0 if power == -128 else min(max(power, -100), 100)
+        self.target = None
+        self.speed = 0
+        self.setpoint = self.encoder
+        self.setpoint_velocity = 0
+        self.overloaded = False
 
     def set_dps(self, dps: float) -> None:
+        self._close_loop()
         self.target = None
         self.speed = dps
 
+    # Leave the open loop mode, the profile starts from the current position and speed of the motor
+    def _close_loop(self) -> None:
+        if not self.open_loop: return
+        self.open_loop = False
+        self.setpoint = self.encoder
+        self.setpoint_velocity = self.velocity
+        self.integral = 0
+        self.last_error = 0
+        self.control_timer = 0
+
     def offset_encoder(self, degrees: float) -> None:
         self.encoder -= degrees
+        self.setpoint -= degrees
 
 
 class GoPiGoBot(TwoWheelsBot):
+    TELEMETRY_FIELDS = ("x", "y", "heading", "left_encoder", "right_encoder", "left_velocity", "right_velocity", "distance")
+
     def __init__(self, playground: Playground, name: str = "GoPiGo Bot") -> None:
         super().__init__(playground, name)
 
@@ -70,74 +342,433 @@ class GoPiGoBot(TwoWheelsBot):
         self.wheels_distance = 117 # In mm
         self.wheel_diameter = 66.5 # In mm
 
-        self. left_motor = GoPiGoMotor()
-        self.right_motor = GoPiGoMotor()
+        self. left_motor = self.create_motor(0)
+        self.right_motor = self.create_motor(1)
+
+        self.leds = {}   # RGB color by LED bit
+        self.servos = {} # Pulse width in microseconds by servo bit
 
         # Hardwares sensors
         self.distance_sensor = GoPiGoDistanceSensor(self)
+        self.lidar = GoPiGoLidar(self)
+        self.line_follower = GoPiGoLineFollower(self)
+        self.light_color_sensor = GoPiGoLightColorSensor(self)
+        self.imu = GoPiGoIMU(self)
 
         self.update_shape()
 
+    # Side is 0 for the left motor and 1 for the right one
+    def create_motor(self, side: int) -> GoPiGoMotor:
+        return GoPiGoMotor()
+
+    def set_led(self, led: int, red: int, green: int, blue: int) -> None:
+        for i in range(8):
+            if led & (1 << i):
+                self.leds[1 << i] = (red, green, blue)
+
+    def set_servo(self, servo: int, us: int) -> None:
+        for i in range(8):
+            if servo & (1 << i):
+                self.servos[1 << i] = us
+
     def update(self, delta_time: float):
-        self.add_wheel_delta(self.left_motor.update(delta_time), self.right_motor.update(delta_time))
+        left = self.left_motor
+        right = self.right_motor
+        # Split the step where a motor changes its speed, so every part is an exact arc
+        remaining = delta_time
+        while remaining > 0:
+            step = min(remaining, left.next_event(), right.next_event())
+            self.add_wheel_delta(left.advance(step), right.advance(step))
+            remaining -= step
+        self.update_devices(delta_time)
+
+    # The motors reaching a watched window and the continuous samples of the distance sensor
+    def next_wake(self, horizon: float) -> float:
+        sensor = self.distance_sensor
+        if sensor.period is not None:
+            horizon = min(horizon, max(sensor.next_sample_time - self.playground.sim_time, 0))
+        return min(horizon, self.left_motor.next_watch_event(horizon), self.right_motor.next_watch_event(horizon))
+
+    def telemetry(self) -> tuple:
+        left = self.left_motor
+        right = self.right_motor
+        cache = self.distance_sensor.cache # Last distance read by the program, not a new reading
+        return (self.x, self.y, self.heading, left.encoder, right.encoder, left.velocity, right.velocity,
+                float('nan') if cache is None else cache[1])
+
+    # Step the sensors that sample on their own, once the bot has moved
+    def update_devices(self, delta_time: float):
+        self.distance_sensor.update(delta_time)
+        self.lidar.update(delta_time)
+        self.imu.update(delta_time)
+
+    def next_event(self) -> float:
+        return min(self.left_motor.next_event(), self.right_motor.next_event(), self.devices_next_event())
+
+    # Simulated seconds until a sensor samples, 0 while a sensor follows the motion every tick
+    def devices_next_event(self) -> float:
+        if self.lidar.enabled or self.imu.enabled:
+            return 0
+        sensor = self.distance_sensor
+        if sensor.period is not None:
+            return sensor.next_sample_time - self.playground.sim_time
+        return inf
 
 
 class GoPiGoDistanceSensor:
     def __init__(self, bot: GoPiGoBot) -> None:
         self.bot = bot
 
+        # Field of view of the sensor in degrees, covered by the given number of rays
+        # 0 to only cast one ray forward (the VL53L0X cone is about 25 degrees wide)
+        self.fov = 0
+        self.rays = 9
+
+        # (key, distance) of the last reading, reused until the tick, the pose or the world change
+        self.cache = None
+
+        # Continuous mode, a sample is taken every period seconds of simulated time
+        self.timing_budget = 0.033 # Duration of one measurement in seconds
+        self.period = None
+        self.next_sample_time = 0
+        self.sample = None # (sample number, distance) of the latest sample
+
+    def start_continuous(self, period: float = 0) -> None:
+        self.period = max(period, self.timing_budget)
+        self.next_sample_time = self.bot.playground.sim_time + self.period
+
+    def update(self, delta_time: float) -> None:
+        if self.period is None: return
+        # Called after the motion of the step, sample at its end time (the rounding of an event step is tolerated)
+        if self.bot.playground.sim_time + delta_time >= self.next_sample_time - 1e-9:
+            number = 0 if self.sample is None else self.sample[0] + 1
+            self.sample = (number, self.read_mm())
+            self.next_sample_time += self.period
+
     def read_mm(self) -> float:
-        rect = self.bot.playground.rect
-        segments = [
-            (rect[0], rect[1], rect[2], rect[1]),
-            (rect[2], rect[1], rect[2], rect[3]),
-            (rect[2], rect[3], rect[0], rect[3]),
-            (rect[0], rect[3], rect[0], rect[1])
-        ]
-        d = self.raytrace(self.bot.x, self.bot.y, cos(self.bot.heading), sin(self.bot.heading), segments)
+        bot = self.bot
+        bot.playground.before_read()
+        world = bot.playground.world
+        key = (bot.playground.ticks, world.version, bot.x, bot.y, bot.heading, self.fov, self.rays)
+        cache = self.cache
+        if cache is not None and cache[0] == key: return cache[1]
+        d = self._read_mm()
+        self.cache = (key, d)
+        return d
+
+    def _read_mm(self) -> float:
+        world = self.bot.playground.world
+        heading = self.bot.heading
+        if self.fov > 0 and self.rays > 1:
+            angles = [heading + radians(self.fov) * (i / (self.rays - 1) - 0.5) for i in range(self.rays)]
+            d, _, _ = world.raycast_many([(self.bot.x, self.bot.y)] * self.rays, [(cos(a), sin(a)) for a in angles])
+            d = float(d.min())
+        else:
+            d, _ = world.raycast(self.bot.x, self.bot.y, cos(heading), sin(heading))
         if d == float('inf'): return 8190
         return d
 
-    def raytrace(self, x, y, dx, dy, segments):
-        best_d = float('inf')
-        for seg in segments:
-            d = self.intersection(x, y, dx, dy, *seg)
-            if d >= 0 and d < best_d:
-                best_d = d
-        return best_d
 
-    def intersection(self, x, y, dx, dy, x1, y1, x2, y2):
-        """
-        a(k) = (x  + k *  dx,  y + k *  dy)
-        b(t) = (x1 + t * idx, y1 + t * idy)
+class GoPiGoLineFollower:
+    """
+    Line follower looking at the floor of the playground, in front of the bot.
+
+    Each photodiode sees a small disc of the floor of footprint mm of diameter, sampled at a few
+    points. All the points of all the photodiodes are sampled by one vectorized call.
+    """
 
-        x + k * dx = x1 + t * idx
-        y + k * dy = y1 + t * idy
+    def __init__(self, bot: GoPiGoBot) -> None:
+        self.bot = bot
+        self.offset = 80    # Distance in mm from the center of the bot to the photodiodes, forward
+        self.spacing = 12   # Distance in mm between two photodiodes
+        self.footprint = 6  # Diameter in mm of the floor area seen by a photodiode
+        self.footprint_points = [(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)] # In footprint radius
+
+        # (key, values) of the last reading, reused until the tick, the pose or the floor change
+        self.cache = None
+
+    def read(self, count: int = 6) -> list:
+        """Values of count photodiodes, from left to right, between 0 (black) and 1 (white)."""
+        bot = self.bot
+        bot.playground.before_read()
+        floor = bot.playground.floor
+        key = (bot.playground.ticks, floor, bot.x, bot.y, bot.heading, count)
+        cache = self.cache
+        if cache is not None and cache[0] == key: return list(cache[1])
+
+        if floor is None:
+            values = [1.0] * count
+        else:
+            # Points seen by the photodiodes, forward and to the left of the bot center
+            footprint = np.array(self.footprint_points) * (self.footprint / 2)
+            forward = self.offset + footprint[:, 0]
+            left = ((count - 1) / 2 - np.arange(count))[:, None] * self.spacing + footprint[:, 1]
+            c, s = cos(bot.heading), sin(bot.heading)
+            points = np.stack((bot.x + c * forward - s * left, bot.y + s * forward + c * left), axis=-1)
+            gray = floor.sample_gray(points).reshape(count, -1).mean(axis=1)
+            values = [round(v * 1023) / 1023 for v in gray.tolist()] # 10 bits converter
 
-        k = (x1 + t * idx - x) / dx
-        y + ((x1 + t * idx - x) / dx) * dy = y1 + t * idy
+        self.cache = (key, values)
+        return list(values)
 
-        y - y1 + (x1 - x) * (dy / dx) = t * idy - t * idx * (dy / dx)
 
-        t = (y - y1 + (x1 - x) * (dy / dx)) / (idy - idx * (dy / dx))
-        """
-        idx = x2 - x1
-        idy = y2 - y1
+class GoPiGoLightColorSensor:
+    """
+    TCS34725 light and color sensor looking at the floor of the playground, in front of the bot.
 
-        if dx == 0:
-            if idx == 0: return -1
-            d = (x - x1) / idx * idy + y1 - y
-            if dy < 0 and d < 0: return -d
-            elif dy > 0 and d > 0: return d
-            return -1
+    Same interface as the TCS34725 driver of di_sensors. The floor color under the footprint is
+    lit by the LED of the sensor (when on) and the ambient light, amplified by the gain and
+    counted over the integration time, saturating like the real converters. The clear channel
+    is modeled as the brightest color channel plus some infrared light.
+    """
 
-        a = (idy - idx * (dy / dx))
-        if a == 0: return -1
+    GAINS = {0x00: 1, 0x01: 4, 0x02: 16, 0x03: 60} # Gain by register value (TCS34725.GAIN_1X to GAIN_60X)
 
-        t = (y - y1 + (x1 - x) * (dy / dx)) / a
-        k = (x1 + t * idx - x) / dx
+    def __init__(self, bot: GoPiGoBot) -> None:
+        self.bot = bot
+        self.offset = 60   # Distance in mm from the center of the bot to the sensor, forward
+        self.footprint = 8 # Diameter in mm of the floor area seen by the sensor
+        self.footprint_points = [(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)] # In footprint radius
+
+        self.led_light = 1        # Light of the LED reflected by a white floor, relative
+        self.ambient_light = 0.1  # Ambient light reflected by a white floor, relative
+        self.sensitivity = 0.04   # Normalized count per unit of reflected light and of gain
+        self.clear_offset = 0.005 # Normalized count of the clear channel coming from infrared light
+
+        self.led = False
+        self.integration_time_val = 0
+        self.gain = 0x02
+        self.set_integration_time(0.0048)
+
+        # (key, (r, g, b)) of the last floor color, reused until the tick, the pose or the floor change
+        self.cache = None
+
+    def set_integration_time(self, integration_time: float) -> None:
+        self.integration_time_val = min(255, max(0, int(0x100 - (integration_time / 0.0024))))
+
+    def set_gain(self, gain: int) -> None:
+        self.gain = gain
+
+    def set_interrupt(self, state: bool) -> None:
+        self.led = bool(state) # The LED is wired to the interrupt pin
+
+    def floor_color(self):
+        """Reflectance (r, g, b) of the floor under the sensor, between 0 and 1."""
+        bot = self.bot
+        floor = bot.playground.floor
+        key = (bot.playground.ticks, floor, bot.x, bot.y, bot.heading)
+        cache = self.cache
+        if cache is not None and cache[0] == key: return cache[1]
+
+        if floor is None:
+            color = (1.0, 1.0, 1.0)
+        else:
+            footprint = np.array(self.footprint_points) * (self.footprint / 2)
+            forward = self.offset + footprint[:, 0]
+            left = footprint[:, 1]
+            c, s = cos(bot.heading), sin(bot.heading)
+            points = np.stack((bot.x + c * forward - s * left, bot.y + s * forward + c * left), axis=-1)
+            values = floor.sample(points).mean(axis=0).tolist()
+            color = tuple(values * 3) if len(values) == 1 else tuple(values)
+
+        self.cache = (key, color)
+        return color
+
+    def get_raw_data(self, delay: bool = True):
+        """Normalized (r, g, b, c) counts, between 0 and 1."""
+        self.bot.playground.before_read()
+        cycles = 256 - self.integration_time_val
+        if delay:
+            time.sleep(cycles * 0.0024) # Wait for a complete integration
+        div = cycles * 1024
+        max_count = min(65535, div)
+        light = (self.led_light if self.led else 0) + self.ambient_light
+        scale = light * self.GAINS[self.gain] * self.sensitivity * div
+        r, g, b = [min(int(v * scale), max_count) / div for v in self.floor_color()]
+        c = min(max(r, g, b) + self.clear_offset, max_count / div)
+        return (r, g, b, c)
+
+
+class GoPiGoIMU:
+    """
+    BNO055 inertial measurement unit, with the same interface as its di_sensors driver.
+
+    Once started, the pose of the bot is pushed every tick into a ring buffer of the last 3
+    poses, from which the angular rate and the acceleration are computed by finite differences.
+    All the readings are then published at once, so reading them costs nothing.
+
+    The sensor is mounted vertically: its x axis points to the left of the bot, y up and z
+    forward. The north is toward the top of the playground (y > 0). The quaternion is the rotation
+    around the y axis of the sensor from facing the north, so it turns as the gyroscope measures.
+    """
+
+    GRAVITY = 9.80665 # In m/s^2
 
-        if k < 0 or t > 1 or t < 0: return -1
+    def __init__(self, bot: GoPiGoBot) -> None:
+        self.bot = bot
+        self.magnetic_field = (20, -45) # Horizontal (toward the north) and vertical (up) field in micro-Teslas
+        self.temperature = 25 # In Celsius degrees
+        self.enabled = False
+        self.time = 0
+        self.poses = deque(maxlen=3) # (time, x, y, heading) of the last ticks
+        self._publish(0, 0, 0)
+
+    def start(self) -> None:
+        self.poses.clear()
+        self.enabled = True
+        self._publish(0, 0, 0)
+
+    def update(self, delta_time: float) -> None:
+        if not self.enabled: return
+        bot = self.bot
+        self.time += delta_time
+        poses = self.poses
+        poses.append((self.time, bot.x, bot.y, bot.heading))
+        if len(poses) < 3: return
+
+        (t0, x0, y0, _), (t1, x1, y1, h1), (t2, x2, y2, h2) = poses
+        dt1 = t1 - t0
+        dt2 = t2 - t1
+        if dt1 <= 0 or dt2 <= 0: return
+        rate = (h2 - h1) / dt2
+        # Acceleration in mm/s^2 in the playground, then along the forward and left axes of the bot
+        ax = ((x2 - x1) / dt2 - (x1 - x0) / dt1) / ((dt1 + dt2) / 2)
+        ay = ((y2 - y1) / dt2 - (y1 - y0) / dt1) / ((dt1 + dt2) / 2)
+        c, s = cos(h2), sin(h2)
+        self._publish(rate, ax * c + ay * s, -ax * s + ay * c)
+
+    # Compute every reading from the heading, the angular rate (rad/s) and the acceleration (mm/s^2)
+    def _publish(self, rate: float, forward: float, left: float) -> None:
+        heading = self.bot.heading
+        horizontal, vertical = self.magnetic_field
+        c, s = cos(heading), sin(heading)
+        yaw = heading - pi / 2 # Counterclockwise from the north, seen from above
+        linear = (left / 1000, 0.0, forward / 1000)
+        gravity = (0.0, self.GRAVITY, 0.0) # The accelerometer feels the ground pushing up
+        self.readings = {
+            "euler": ((90 - degrees(heading)) % 360, 0.0, 0.0),
+            "magnetometer": (horizontal * c, vertical, horizontal * s),
+            "gyroscope": (0.0, degrees(rate), 0.0),
+            "linear_acceleration": linear,
+            "gravity": gravity,
+            "accelerometer": tuple(l + g for l, g in zip(linear, gravity)),
+            "quaternion": (0.0, sin(yaw / 2), 0.0, cos(yaw / 2)), # (x, y, z, w)
+        }
+
+    # Reading computed by the last update
+    def _read(self, name: str):
+        self.bot.playground.before_read()
+        return self.readings[name]
+
+    def read_euler(self):
+        return self._read("euler")
+
+    def read_magnetometer(self):
+        return self._read("magnetometer")
+
+    def read_gyroscope(self):
+        return self._read("gyroscope")
+
+    def read_accelerometer(self):
+        return self._read("accelerometer")
+
+    def read_linear_acceleration(self):
+        return self._read("linear_acceleration")
+
+    def read_gravity(self):
+        return self._read("gravity")
+
+    def read_quaternion(self):
+        return self._read("quaternion")
+
+    def read_temp(self):
+        return self.temperature
+
+    def get_calibration_status(self):
+        return (3, 3, 3, 3) # System, gyroscope, accelerometer and magnetometer are calibrated
+
+
+class GoPiGoLidar:
+    """
+    Rotating lidar mounted at the center of the bot.
+
+    The head turns at scan_rate turns per second and casts one beam every resolution degrees,
+    counterclockwise from the front of the bot, so the beams of a scan are cast from the pose
+    the bot had when the head passed over them. Each complete scan is published as a new
+    (sim time, angles, distances) tuple that is never modified afterwards, so get_scan returns
+    the latest one without computing anything. Distances are in mm, inf when nothing is hit
+    within max_range.
+    """
 
-        ix, iy = t * idx + x1, t * idy + y1
-        return ((ix - x)**2 + (iy - y)**2)**.5
+    def __init__(self, bot: GoPiGoBot) -> None:
+        self.bot = bot
+        self.resolution = 1    # Degrees between two beams
+        self.scan_rate = 10    # Turns per second
+        self.max_range = 12000 # In mm
+        self.enabled = False
+
+        self.angles = None   # Angles of the beams in radians, relative to the bot heading
+        self.scan = None     # Distances of the scan in progress
+        self.next_beam = 0   # Index of the next beam of the scan in progress
+        self.head_angle = 0  # Rotation of the head since the start of the scan, in degrees
+        self.latest = None   # Latest complete scan
+        self.scan_count = 0
+
+    def start(self, resolution: float = None, scan_rate: float = None, max_range: float = None) -> None:
+        if resolution is not None: self.resolution = resolution
+        if scan_rate is not None: self.scan_rate = scan_rate
+        if max_range is not None: self.max_range = max_range
+
+        beams = max(1, round(360 / self.resolution))
+        angles = [radians(i * 360 / beams) for i in range(beams)]
+        self.angles = np.array(angles) if numpy_available else array('d', angles)
+        self._new_scan()
+        self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+
+    def _new_scan(self) -> None:
+        beams = len(self.angles)
+        self.scan = np.full(beams, float('inf')) if numpy_available else array('d', [float('inf')]) * beams
+        self.next_beam = 0
+        self.head_angle = 0
+
+    def _cast(self, first: int, last: int) -> None:
+        bot = self.bot
+        world = bot.playground.world
+        if numpy_available:
+            angles = self.angles[first:last] + bot.heading
+            origins = np.empty((last - first, 2))
+            origins[:, 0] = bot.x
+            origins[:, 1] = bot.y
+            d, _, _ = world.raycast_many(origins, np.column_stack((np.cos(angles), np.sin(angles))), self.max_range)
+            self.scan[first:last] = d
+        else:
+            for i in range(first, last):
+                a = bot.heading + self.angles[i]
+                self.scan[i], _ = world.raycast(bot.x, bot.y, cos(a), sin(a), self.max_range)
+
+    def update(self, delta_time: float) -> None:
+        if not self.enabled: return
+        beams = len(self.angles)
+        step = 360 / beams
+        self.head_angle += 360 * self.scan_rate * delta_time
+        while True:
+            last = min(int(self.head_angle / step) + 1, beams)
+            if last > self.next_beam:
+                self._cast(self.next_beam, last)
+                self.next_beam = last
+            if last < beams: break
+
+            # Publish the complete scan and start the next one where the head is
+            self.latest = (self.bot.playground.sim_time, self.angles, self.scan)
+            self.scan_count += 1
+            head_angle = self.head_angle - 360
+            self._new_scan()
+            self.head_angle = max(head_angle, 0)
+
+    def get_scan(self):
+        """Return the latest complete scan as (sim time, angles, distances), or None before the first one."""
+        self.bot.playground.before_read()
+        return self.latest
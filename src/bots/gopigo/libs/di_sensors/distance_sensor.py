@@ -27,6 +27,10 @@ class DistanceSensor(object):
         """
         import builtins
         self.sensor = builtins.EMULATED_BOT.distance_sensor
+        self.playground = builtins.EMULATED_BOT.playground
+        self.timeout = 0.5 # In seconds
+        self.did_timeout = False
+        self.last_sample = None # Number of the last sample read in continuous mode
 
     def start_continuous(self, period_ms = 0):
         """
@@ -42,7 +46,7 @@ class DistanceSensor(object):
         Also, the greater the value set to ``period_ms``, the higher is the accuracy of the distance sensor.
 
         """
-        pass #self.VL53L0X.start_continuous(period_ms)
+        self.playground.post(self.sensor.start_continuous, period_ms / 1000)
 
     def read_range_continuous(self):
         """
@@ -60,7 +64,16 @@ class DistanceSensor(object):
             method is bigger than **500 ms**.
 
         """
-        return self.sensor.read_mm()
+        # Wait for a sample that has not been read yet, like the sensor interrupt status
+        def sample_ready():
+            sample = self.sensor.sample
+            return sample is not None and sample[0] != self.last_sample
+
+        if not self.playground.wait_until(sample_ready, self.timeout):
+            self.did_timeout = True
+            raise OSError("read_range_continuous timeout")
+        self.last_sample, value = self.sensor.sample
+        return value
 
     def read_range_single(self, safe_infinity=True):
         """
@@ -95,4 +108,6 @@ class DistanceSensor(object):
         :rtype: bool
 
         """
-        return False #self.VL53L0X.timeout_occurred()
+        did_timeout = self.did_timeout
+        self.did_timeout = False
+        return did_timeout
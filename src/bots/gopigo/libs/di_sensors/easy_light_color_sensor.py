@@ -20,6 +20,12 @@ from di_sensors import light_color_sensor
 from time import sleep
 from math import sqrt
 
+try:
+    import numpy as np
+    numpy_available = True
+except ImportError:
+    numpy_available = False
+
 '''
 MUTEX HANDLING
 '''
@@ -65,6 +71,11 @@ class EasyLightColorSensor(light_color_sensor.LightColorSensor):
         "fuchsia": (300,100,100)
     }
 
+    #: Size of the bins of the lookup table used by :py:meth:`~di_sensors.easy_light_color_sensor.EasyLightColorSensor.guess_color_hsv`,
+    #: in degrees of hue and in percents of saturation and value.
+    hsv_steps = (2, 2, 2)
+    _hsv_lut = None # (known_hsv when built, color names, nearest color index by quantized h, s, v)
+
     def __init__(self, port="I2C", led_state = False, use_mutex=False):
         """
         Constructor for initializing a link to the `Light Color Sensor`_.
@@ -224,6 +235,10 @@ class EasyLightColorSensor(light_color_sensor.LightColorSensor):
             print("division by 0; coping")
             h, s, v = colorsys.rgb_to_hsv(r, g, b)
         
+        candidate = self._guess_color_lut(360*h, 100*s, 100*v)
+        if candidate is not None:
+            return (candidate, self.known_colors[candidate])
+
         min_distance = 255
         for color in self.known_hsv:
             # LJM: extra line for improved readability in calculation below
@@ -238,3 +253,35 @@ class EasyLightColorSensor(light_color_sensor.LightColorSensor):
                 candidate = color
 
         return (candidate, self.known_colors[candidate])
+
+    def _guess_color_lut(self, h, s, v):
+        """
+        Nearest color of :py:attr:`~di_sensors.easy_light_color_sensor.EasyLightColorSensor.known_hsv` found in a lookup table
+        over quantized HSV values, built once for the current centroids. Returns ``None`` when the table can't tell for sure
+        (near the border between two colors) or can't be used, the caller then computes the distances.
+        """
+        if not numpy_available:
+            return None
+        hs, ss, vs = self.hsv_steps
+        hi, si, vi = int(h / hs + 0.5), int(s / ss + 0.5), int(v / vs + 0.5)
+
+        known = tuple((color, tuple(centroid)) for color, centroid in self.known_hsv.items())
+        lut = EasyLightColorSensor._hsv_lut
+        if lut is None or lut[0] != known:
+            # Distance of the center of every bin to every centroid, same metric as the loop of guess_color_hsv
+            grid = np.meshgrid(np.arange(360 // hs + 1) * hs, np.arange(100 // ss + 1) * ss, np.arange(100 // vs + 1) * vs, indexing="ij")
+            distances = np.stack([np.sqrt(sum((axis - c) ** 2 for axis, c in zip(grid, centroid))) for _, centroid in known])
+            order = np.sort(distances, axis=0)
+            nearest = np.argmin(distances, axis=0).astype(np.uint8)
+            # Points of a bin are at most radius away from its center, so the nearest color is the same
+            # for the whole bin unless the two nearest centroids (or the 255 limit) are too close
+            radius = sqrt((hs / 2) ** 2 + (ss / 2) ** 2 + (vs / 2) ** 2)
+            second = order[1] if len(known) > 1 else np.inf
+            nearest[(second - order[0] <= 2 * radius) | (order[0] + radius >= 255)] = 255
+            lut = EasyLightColorSensor._hsv_lut = (known, [color for color, _ in known], nearest)
+
+        table = lut[2]
+        if not (0 <= hi < table.shape[0] and 0 <= si < table.shape[1] and 0 <= vi < table.shape[2]):
+            return None # Outside of the table, e.g. when the color channels are brighter than the clear one
+        index = table[hi, si, vi]
+        return None if index == 255 else lut[1][index]
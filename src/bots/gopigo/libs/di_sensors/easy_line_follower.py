@@ -100,12 +100,7 @@ class EasyLineFollower(object):
         2 - for detecting the line follower (black board)
         """
         # see if the device is up and running
-        device_on = False
-        try:
-            self._test_dev.i2c_bus.read_8()
-            device_on = True
-        except:
-            pass
+        device_on = True # The emulated bot always has a line follower
         
         if device_on is True:
             # then it means we have a line follower connected
@@ -26,7 +26,9 @@ class InertialMeasurementUnit(object):
 
         """
         try:
-            pass #self.BNO055 = BNO055.BNO055(bus = bus)
+            import builtins
+            self.BNO055 = builtins.EMULATED_BOT.imu #BNO055.BNO055(bus = bus)
+            builtins.EMULATED_BOT.playground.post(self.BNO055.start)
         except RuntimeError:
             raise RuntimeError('Failed to initialize Dexter Industries IMU sensor')
 
@@ -35,7 +35,10 @@ class LightColorSensor(object):
         :raises ~exceptions.RuntimeError: When the chip ID is incorrect. This happens when we have a device pointing to the same address, but it's not a `Light Color Sensor`_.
 
         """
-        self.TCS34725 = None #TCS34725.TCS34725(sensor_integration_time, sensor_gain, bus)
+        import builtins
+        self.TCS34725 = builtins.EMULATED_BOT.light_color_sensor #TCS34725.TCS34725(sensor_integration_time, sensor_gain, bus)
+        self.TCS34725.set_integration_time(sensor_integration_time)
+        self.TCS34725.set_gain(0x02 if sensor_gain is None else sensor_gain) # TCS34725.GAIN_16X by default
         if PCA9570LED:
             pass #self.PCA9570 = PCA9570.PCA9570(bus)
         self.set_led(led_state)
@@ -38,6 +38,8 @@ class LineFollower(object):
 
         # create an I2C bus object and set the address
         self.i2c_bus = None #di_i2c.DI_I2C(bus = bus, address = 0x06)
+        import builtins
+        self.sensor = builtins.EMULATED_BOT.line_follower
 
     def read_sensors(self):
         """
@@ -48,15 +50,7 @@ class LineFollower(object):
         :raises ~exceptions.OSError: When the `Line Follower Sensor (black board)`_ is not reachable.
         """
 
-        array = self.i2c_bus.read_list(0x01, 8)
-        for s in range(6):
-            array[s] = (array[s] << 2) | ((array[6 + int(s / 4)] >> (2 * (s % 4))) & 0x03)
-            array[s] = (1023 - array[s]) / 1023.0
-        
-        array = array[:6]
-        array = array[::-1]
-
-        return array
+        return self.sensor.read(6)
 
     def get_manufacturer(self):
         """
@@ -67,15 +61,7 @@ class LineFollower(object):
         :raises ~exceptions.OSError: When the `Line Follower Sensor (black board)`_ is not reachable.
         """
 
-        array = self.i2c_bus.read_list(0x11, 20)
-
-        name = ""
-        for c in range(20):
-            if array[c] != 0:
-                name += chr(array[c])
-            else:
-                break
-        return name
+        return "Dexter Industries"
 
     def get_board(self):
         """
@@ -86,15 +72,7 @@ class LineFollower(object):
         :raises ~exceptions.OSError: When the `Line Follower Sensor (black board)`_ is not reachable.
         """
 
-        array = self.i2c_bus.read_list(0x12, 20)
-
-        name = ""
-        for c in range(20):
-            if array[c] != 0:
-                name += chr(array[c])
-            else:
-                break
-        return name
+        return "Line Follower"
 
     def get_version_firmware(self):
         """
@@ -104,8 +82,7 @@ class LineFollower(object):
         :rtype: str
         :raises ~exceptions.OSError: When the `Line Follower Sensor (black board)`_ is not reachable.
         """
-        self.i2c_bus.write_8(0x13)
-        return self.i2c_bus.read_32()
+        return 1
 
 
 class LineFollowerRed(object):
@@ -121,6 +98,8 @@ class LineFollowerRed(object):
 
         # create an I2C bus object and set the address
         self.i2c_bus = None #di_i2c.DI_I2C(bus = bus, address = 0x06)
+        import builtins
+        self.sensor = builtins.EMULATED_BOT.line_follower
 
     def read_sensors(self):
         """
@@ -131,14 +110,5 @@ class LineFollowerRed(object):
         :raises ~exceptions.OSError: When the depreciated `Line Follower Sensor (red board)`_ is not reachable.
         """
 
-        self.i2c_bus.write_reg_list(0x01, [0x03] + 3 * [0x00])
-        time.sleep(0.01)
-        self.i2c_bus.write_reg_list(0x01, [0x03] + 3 * [0x00])
-        array = self.i2c_bus.read_list(None, 10)
-
-        output = []
-        for step in range(5):
-            temp = array[2 * step] * 256 + array[2 * step + 1]
-            output.append((1023 - temp) / 1023.0)
-
-        return output[::-1]
+        time.sleep(0.01) # The red board needs 10 ms to take a reading
+        return self.sensor.read(5)
@@ -239,10 +239,8 @@ class EasyGoPiGo3(gopigo3.GoPiGo3):
                                 (StartPositionRight + WheelTurnDegrees))
 
         if blocking:
-            while self.target_reached(
-                    StartPositionLeft + WheelTurnDegrees,
-                    StartPositionRight + WheelTurnDegrees) is False:
-                time.sleep(0.1)
+            self.wait_target_reached(StartPositionLeft + WheelTurnDegrees,
+                                     StartPositionRight + WheelTurnDegrees)
 
     def drive_inches(self, dist, blocking=True):
         """
@@ -310,10 +308,8 @@ class EasyGoPiGo3(gopigo3.GoPiGo3):
 
 
         if blocking:
-            while self.target_reached(
-                    StartPositionLeft + degrees,
-                    StartPositionRight + degrees) is False:
-                time.sleep(0.1)
+            self.wait_target_reached(StartPositionLeft + degrees,
+                                     StartPositionRight + degrees)
         return
 
 
@@ -485,10 +481,8 @@ class EasyGoPiGo3(gopigo3.GoPiGo3):
         self.set_motor_position(self.MOTOR_RIGHT, (StartPositionRight + (right_target * direction)))
 
         if blocking:
-            while self.target_reached(
-                    StartPositionLeft + (left_target * direction),
-                    StartPositionRight + (right_target * direction)) is False:
-                time.sleep(0.1)
+            self.wait_target_reached(StartPositionLeft + (left_target * direction),
+                                     StartPositionRight + (right_target * direction))
 
             # reset to original speed once done
             # if non-blocking, then the user is responsible in resetting the speed
@@ -589,6 +583,31 @@ class EasyGoPiGo3(gopigo3.GoPiGo3):
         else:
             return False
 
+    def wait_target_reached(self, left_target_degrees, right_target_degrees):
+        """
+        Blocks until :py:meth:`~easygopigo3.EasyGoPiGo3.target_reached` returns ``True`` for the given targets.
+
+        The emulator checks the targets after each simulation tick, and the motors end a tick early
+        when they reach the targets, so the call returns as soon as the motors complete their move
+        instead of polling them.
+
+        :param int left_target_degrees: Target degrees for the *left* wheel.
+        :param int right_target_degrees: Target degrees for the *right* wheel.
+
+        """
+        tolerance = 5 # As target_reached
+        playground = self.BOT.playground
+        windows = ((self.BOT.left_motor, left_target_degrees - tolerance, left_target_degrees + tolerance),
+                   (self.BOT.right_motor, right_target_degrees - tolerance, right_target_degrees + tolerance))
+        for motor, low, high in windows:
+            playground.post(motor.watch, low, high)
+        try:
+            playground.wait_until(
+                lambda: self.target_reached(left_target_degrees, right_target_degrees))
+        finally:
+            for motor, low, high in windows:
+                playground.post(motor.unwatch, low, high)
+
     def reset_encoders(self, blocking=True):
         """
         Resets both the encoders back to **0**.
@@ -708,10 +727,8 @@ class EasyGoPiGo3(gopigo3.GoPiGo3):
                                 (StartPositionRight - WheelTurnDegrees))
 
         if blocking:
-            while self.target_reached(
-                    StartPositionLeft + WheelTurnDegrees,
-                    StartPositionRight - WheelTurnDegrees) is False:
-                time.sleep(0.1)
+            self.wait_target_reached(StartPositionLeft + WheelTurnDegrees,
+                                     StartPositionRight - WheelTurnDegrees)
 
 
     def blinker_on(self, id):
@@ -1047,6 +1064,22 @@ class EasyGoPiGo3(gopigo3.GoPiGo3):
 
         return d
 
+    def init_lidar(self, resolution=1, scan_rate=10, max_range=12000):
+        """
+
+        Starts the rotating lidar of the emulated bot and returns it.
+
+        :param float resolution = 1: The angle between two beams, in degrees.
+        :param float scan_rate = 10: The number of full turns per second.
+        :param float max_range = 12000: The maximum range of the beams, in millimeters.
+        :returns: The lidar, whose ``get_scan`` method returns the latest complete scan as a ``(time, angles, distances)`` tuple, or ``None`` until the first turn is done.
+
+        Angles are in radians, counterclockwise from the front of the robot, and distances in millimeters (``inf`` when nothing is in range).
+
+        """
+        self.BOT.playground.post(self.BOT.lidar.start, resolution, scan_rate, max_range)
+        return self.BOT.lidar
+
     def init_light_color_sensor(self, port = "I2C", led_state=True):
         """
 
@@ -78,6 +78,19 @@ class GoPiGo3(object):
 
     MOTOR_FLOAT = -128
 
+    LED_EYE_LEFT      = 0x02
+    LED_EYE_RIGHT     = 0x01
+    LED_BLINKER_LEFT  = 0x04
+    LED_BLINKER_RIGHT = 0x08
+    LED_LEFT_EYE      = LED_EYE_LEFT
+    LED_RIGHT_EYE     = LED_EYE_RIGHT
+    LED_LEFT_BLINKER  = LED_BLINKER_LEFT
+    LED_RIGHT_BLINKER = LED_BLINKER_RIGHT
+    LED_WIFI  = 0x80 # Used to indicate WiFi status. Should not be controlled by the user.
+
+    SERVO_1 = 0x01
+    SERVO_2 = 0x02
+
     BOT = None
 
     def __init__(self, addr = 8, detect = True, config_file_path="/home/pi/Dexter/gpg3_config.json"):
@@ -187,8 +200,7 @@ class GoPiGo3(object):
         if blue < 0:
             blue = 0
 
-        print("set_led() called")
-        # TODO
+        self.BOT.playground.post(self.BOT.set_led, led, red, green, blue)
 
     def get_voltage_5v(self):
         """
@@ -218,8 +230,7 @@ class GoPiGo3(object):
         servo -- The servo(s). SERVO_1 and/or SERVO_2.
         us -- The pulse width in microseconds (0-16666)
         """
-        print("set_servo() called")
-        # TODO
+        self.BOT.playground.post(self.BOT.set_servo, servo, us)
 
     def set_motor_power(self, port, power):
         """
@@ -233,7 +244,7 @@ class GoPiGo3(object):
             power = 127
         if(power < -128):
             power = -128
-        self.MOTORS[port].set_power(power)
+        self.BOT.playground.post(self.MOTORS[port].set_power, power)
 
     def set_motor_position(self, port, position):
         """
@@ -243,7 +254,7 @@ class GoPiGo3(object):
         port -- The motor port(s). MOTOR_LEFT and/or MOTOR_RIGHT.
         position -- The target position
         """
-        self.MOTORS[port].set_position(position)
+        self.BOT.playground.post(self.MOTORS[port].set_position, position)
 
     def set_motor_dps(self, port, dps):
         """
@@ -253,7 +264,7 @@ class GoPiGo3(object):
         port -- The motor port(s). MOTOR_LEFT and/or MOTOR_RIGHT.
         dps -- The target speed in degrees per second
         """
-        self.MOTORS[port].set_dps(dps)
+        self.BOT.playground.post(self.MOTORS[port].set_dps, dps)
 
     def set_motor_limits(self, port, power = 0, dps = 0):
         """
@@ -264,7 +275,7 @@ class GoPiGo3(object):
         power -- The power limit in percent (0 to 100), with 0 being no limit (100)
         dps -- The speed limit in degrees per second, with 0 being no limit
         """
-        self.MOTORS[port].set_limits(dps)
+        self.BOT.playground.post(self.MOTORS[port].set_limits, dps)
 
     def get_motor_status(self, port):
         """
@@ -289,6 +300,7 @@ class GoPiGo3(object):
             raise IOError("get_motor_status error. Must be one motor port at a time. MOTOR_LEFT or MOTOR_RIGHT.")
             return
 
+        self.BOT.playground.before_read()
         return self.MOTORS[port].get_status()
 
     def get_motor_encoder(self, port):
@@ -308,6 +320,7 @@ class GoPiGo3(object):
             raise IOError("Port(s) unsupported. Must be one at a time.")
             return 0
 
+        self.BOT.playground.before_read()
         return self.MOTORS[port].get_encoder()
 
     def offset_motor_encoder(self, port, offset):
@@ -320,7 +333,7 @@ class GoPiGo3(object):
 
         Zero the encoder by offsetting it by the current position
         """
-        self.MOTORS[port].offset_encoder(offset)
+        self.BOT.playground.post(self.MOTORS[port].offset_encoder, offset)
 
     def reset_motor_encoder(self, port):
         """
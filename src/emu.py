@@ -1,13 +1,74 @@
 import time
+import heapq
+import threading
 from threading import Thread
-import tkinter as tk
-import turtle
 import uuid
-from math import pi, cos, sin, radians, degrees
+from array import array
+from collections import deque
+from math import pi, cos, sin, radians, degrees, atan2, asin, hypot, sqrt, ceil
 
-class Playground:
-    # Scale is in pixels / mm
-    def __init__(self, width, height, title="Robot playground", scale=1.04) -> None:
+from .world import World
+from .floor import Floor
+from .recorder import Recorder, Recording, Replay
+
+wall_clock = time.perf_counter # Kept as the simulation clock replaces time.perf_counter in user threads
+
+class NullTurtle:
+    """Stand-in for turtle.RawTurtle that ignores every drawing call."""
+
+    def __getattr__(self, name):
+        return self._ignore
+
+    def _ignore(self, *args, **kwargs):
+        pass
+
+
+class NullRenderer:
+    """Headless rendering backend : nothing is drawn and no Tk object is created."""
+
+    headless = True
+    closed_errors = () # Exceptions raised by the drawing calls once the window is closed
+
+    def __init__(self, width, height, title="Robot playground") -> None:
+        self.width = width
+        self.height = height
+
+    def create_turtle(self):
+        return NullTurtle()
+
+    def add_shape(self, bot) -> None:
+        pass
+
+    def draw_trail(self, trail, color) -> None:
+        pass
+
+    def draw_floor(self, floor, scale) -> None:
+        pass
+
+    def get_size(self):
+        return self.width, self.height
+
+    def bind_key(self, key: str, callback) -> None:
+        pass
+
+    def set_status(self, text: str) -> None:
+        pass
+
+    def update(self) -> None:
+        pass
+
+
+class TurtleRenderer(NullRenderer):
+    """Rendering backend drawing the playground in a Tk window with turtle."""
+
+    headless = False
+
+    def __init__(self, width, height, title="Robot playground") -> None:
+        import tkinter as tk
+        import turtle
+        super().__init__(width, height, title)
+        self.closed_errors = (turtle.Terminator, tk.TclError)
+        self.title = title
         self.root = tk.Tk()
         self.root.geometry("%ix%i" % (width, height))
         self.root.title(title)
@@ -17,24 +78,477 @@ class Playground:
         self.canvas.xview_moveto(.5)
         self.canvas.yview_moveto(.5)
         self.screen = turtle.TurtleScreen(self.canvas)
-        self.screen.tracer(1, 0)
+        self.screen.tracer(0, 0) # The playground refreshes the screen at its display rate
+        self.floor_image = None
+        self.floor_item = None
+
+    def create_turtle(self):
+        import turtle
+        return turtle.RawTurtle(self.screen)
+
+    def add_shape(self, bot) -> None:
+        bot.build_shape()
+        if bot.shape is not None:
+            self.screen.addshape(bot.shape_name, bot.shape)
+            bot.turtle.shape(bot.shape_name)
+
+    # Draw the points of the trail changed since the last call, CHUNK points per canvas line item
+    def draw_trail(self, trail, color) -> None:
+        import tkinter as tk
+        if trail.reset:
+            for item in trail.items.values():
+                self.canvas.delete(item)
+            trail.items.clear()
+            trail.reset = False
+        if trail.dirty is None:
+            return
+
+        chunk_size = trail.CHUNK
+        first_stroke, first_index = trail.dirty
+        for stroke in range(first_stroke, len(trail.strokes)):
+            xs, ys = trail.strokes[stroke]
+            first_chunk = max(0, first_index - 1) // chunk_size if stroke == first_stroke else 0
+            chunks = max(1, (len(xs) - 2) // chunk_size + 1)
+            for chunk in range(first_chunk, chunks):
+                start = chunk * chunk_size
+                end = min(start + chunk_size + 1, len(xs))
+                coords = []
+                for i in range(start, end):
+                    coords.append(xs[i])
+                    coords.append(-ys[i])
+                if len(coords) < 4:
+                    coords *= 2 # A line item needs two points
+                item = trail.items.get((stroke, chunk))
+                if item is None:
+                    item = self.canvas.create_line(coords, fill=color, width=1, capstyle=tk.ROUND)
+                    self.canvas.tag_lower(item)
+                    if self.floor_item is not None:
+                        self.canvas.tag_lower(self.floor_item)
+                    trail.items[(stroke, chunk)] = item
+                else:
+                    self.canvas.coords(item, coords)
+        trail.dirty = None
+
+    # Draw the floor under everything else, sampled once at the center of every canvas pixel
+    def draw_floor(self, floor, scale) -> None:
+        if self.floor_item is not None:
+            self.canvas.delete(self.floor_item)
+            self.floor_image = self.floor_item = None
+        if floor is None:
+            return
+
+        import base64
+        import tkinter as tk
+        import numpy as np
+        width, height = self.get_size()
+        xs = (np.arange(width) - width / 2 + 0.5) / scale
+        ys = (height / 2 - 0.5 - np.arange(height)) / scale
+        points = np.stack(np.broadcast_arrays(xs[None, :], ys[:, None]), axis=-1)
+        values = floor.sample(points)
+        if floor.channels == 1:
+            values = np.repeat(values, 3, axis=1)
+        pixels = np.clip(np.rint(values * 255), 0, 255).astype(np.uint8)
+        data = b"P6 %i %i 255\n" % (width, height) + pixels.tobytes()
+        self.floor_image = tk.PhotoImage(data=base64.b64encode(data), format="PPM")
+        self.floor_item = self.canvas.create_image(0, 0, image=self.floor_image)
+        self.canvas.tag_lower(self.floor_item)
+
+    def get_size(self):
+        self.canvas.update()
+        return self.canvas.winfo_width(), self.canvas.winfo_height()
+
+    def bind_key(self, key: str, callback) -> None:
+        self.root.bind("<KeyPress-%s>" % key, lambda event: callback())
+
+    def set_status(self, text: str) -> None:
+        self.root.title("%s - %s" % (self.title, text))
+
+    def update(self) -> None:
+        self.screen.update()
+
+
+class SimClock:
+    """
+    Simulation clock served to the emulated program in place of the time module.
+
+    Once installed, time.sleep, time.time, time.monotonic and time.perf_counter called from a
+    registered thread return the simulated time. A sleeping thread is parked on a heap of deadlines
+    and woken by the playground when the simulated time reaches it. The threads started by a
+    registered thread are registered too, the other threads keep the wall clock.
+
+    The playground only advances once every registered thread is parked, so a run does not depend
+    on the wall clock. Calls to the time functions and device reads are yield points: each one
+    charges yield_cost simulated seconds to the calling thread, which sleeps once it used
+    yield_quantum, so busy loops also let the simulation advance whatever the physics rate. A
+    thread that runs forever without a yield point blocks the simulation.
+    """
+
+    def __init__(self, playground) -> None:
+        self.playground = playground
+        self.condition = threading.Condition()
+        self.sleepers = [] # Heap of (deadline, sequence, event)
+        self.sequence = 0
+        self.running = 0 # Registered threads that are not parked
+        self.threads = {} # Daemon flag of the registered threads by ident
+        self.on_exit = None # Called when the last registered thread that is not a daemon ends
+        self.yield_cost = 0.0001 # Simulated seconds charged to a thread per yield point
+        self.yield_quantum = 0.0025 # Simulated seconds charged before a thread sleeps
+        self.local = threading.local() # Simulated time charged to the calling thread since it last slept
+        self.installed = False
+
+        self.real_sleep = time.sleep
+        self.real_time = time.time
+        self.real_monotonic = time.monotonic
+        self.real_perf_counter = time.perf_counter
+        self.real_thread_start = threading.Thread.start
+
+    def is_emulated(self) -> bool:
+        return threading.get_ident() in self.threads
+
+    def install(self) -> None:
+        if self.installed: return
+        self.time_origin = self.real_time()
+        self.monotonic_origin = self.real_monotonic()
+        self.perf_counter_origin = self.real_perf_counter()
+        time.sleep = self.sleep
+        time.time = self.time
+        time.monotonic = self.monotonic
+        time.perf_counter = self.perf_counter
+        threading.Thread.start = self._thread_start()
+        self.installed = True
+
+    def uninstall(self) -> None:
+        if not self.installed: return
+        time.sleep = self.real_sleep
+        time.time = self.real_time
+        time.monotonic = self.real_monotonic
+        time.perf_counter = self.real_perf_counter
+        threading.Thread.start = self.real_thread_start
+        self.installed = False
+
+    # Thread.start registering the threads started by a registered thread
+    def _thread_start(self):
+        clock = self
+        real_start = self.real_thread_start
+        def start(thread):
+            if not clock.is_emulated():
+                return real_start(thread)
+            daemon = thread.daemon
+            thread.daemon = True # Never keeps the process alive once the playground ended
+            thread.run = clock.register_thread(thread.run, daemon)
+            try:
+                real_start(thread)
+            except BaseException:
+                clock.park() # The thread will never run
+                raise
+        return start
+
+    def time(self) -> float:
+        if not self.is_emulated(): return self.real_time()
+        self.yield_point()
+        return self.time_origin + self.playground.sim_time
+
+    def monotonic(self) -> float:
+        if not self.is_emulated(): return self.real_monotonic()
+        self.yield_point()
+        return self.monotonic_origin + self.playground.sim_time
+
+    def perf_counter(self) -> float:
+        if not self.is_emulated(): return self.real_perf_counter()
+        self.yield_point()
+        return self.perf_counter_origin + self.playground.sim_time
+
+    # Charge yield_cost to the calling user thread, and sleep once it used yield_quantum
+    def yield_point(self) -> None:
+        if not self.installed or not self.is_emulated(): return
+        pending = getattr(self.local, "pending", 0) + self.yield_cost
+        if pending >= self.yield_quantum - 1e-12:
+            self.local.pending = 0
+            self.sleep(pending)
+        else:
+            self.local.pending = pending
+
+    def sleep(self, seconds: float) -> None:
+        if not self.is_emulated() or not self.installed:
+            self.real_sleep(seconds)
+            return
+        if seconds <= 0:
+            self.yield_point()
+            return
+        self.local.pending = 0
+        event = threading.Event()
+        with self.condition:
+            heapq.heappush(self.sleepers, (self.playground.sim_time + seconds, self.sequence, event))
+            self.sequence += 1
+            self.running -= 1
+            self.condition.notify_all()
+        event.wait()
+
+    # Return func wrapped to be the target of a new thread using the simulation clock
+    # The thread counts as running from now on so the playground waits for it to start
+    def register_thread(self, func, daemon: bool = False):
+        self.unpark()
+        def target(*args, **kwargs):
+            ident = threading.get_ident()
+            with self.condition:
+                self.threads[ident] = daemon
+            # The program sees the daemon flag it asked for and the threads it starts inherit it
+            threading.current_thread()._daemonic = daemon
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self.condition:
+                    del self.threads[ident]
+                    last = not daemon and all(self.threads.values())
+                if last and self.on_exit is not None:
+                    self.on_exit() # Before parking so the playground does not step past the end
+                self.park()
+        return target
+
+    # The calling thread is blocked until an other thread calls unpark for it
+    def park(self) -> None:
+        with self.condition:
+            self.running -= 1
+            self.condition.notify_all()
+
+    def unpark(self) -> None:
+        with self.condition:
+            self.running += 1
+
+    # Block until every registered thread is parked or finished, at most timeout wall clock seconds
+    # Return True if every thread is parked
+    def wait_parked(self, timeout: float = None) -> bool:
+        with self.condition:
+            if self.running > 0:
+                self.condition.wait_for(lambda: self.running <= 0, timeout)
+            return self.running <= 0
+
+    def next_deadline(self):
+        return self.sleepers[0][0] if self.sleepers else None
+
+    # Wake up every thread whose deadline is reached (the rounding of a step ending on it is tolerated)
+    def wake_due(self, now: float) -> None:
+        now += 1e-9
+        if not self.sleepers or self.sleepers[0][0] > now: return
+        with self.condition:
+            while self.sleepers and self.sleepers[0][0] <= now:
+                _, _, event = heapq.heappop(self.sleepers)
+                self.running += 1
+                event.set()
+
+
+
+class Trail:
+    """
+    Pen trail of a bot stored as compact arrays of points, one pair of arrays per stroke.
+
+    A new point that stays within tolerance of the line of the current segment replaces the
+    last point instead of being appended, so straight lines and gentle curves only cost a few
+    points. When the trail holds more than max_points points, it is simplified with a growing
+    tolerance and, if still too big, its oldest points are dropped.
+    """
+
+    CHUNK = 1000 # Points per canvas line item
+
+    def __init__(self, max_points: int = 200000, tolerance: float = 0.5) -> None:
+        self.max_points = max_points
+        self.tolerance = tolerance # In pixels
+        self.strokes = [] # List of (xs, ys) arrays
+        self.size = 0
+        self.lifted = True
+        self.cone = None # (reference angle, min angle, max angle, distance) of the current segment
+        self.dirty = None # (stroke, index) of the first point changed since the trail was drawn
+        self.reset = False # True when the drawn trail must be erased before being redrawn
+        self.items = {} # Canvas items of the renderer by (stroke, chunk)
+
+    def _mark(self, stroke: int, index: int) -> None:
+        if self.dirty is None or (stroke, index) < self.dirty:
+            self.dirty = (stroke, index)
+
+    # The next point starts a new stroke
+    def lift(self) -> None:
+        self.lifted = True
+
+    def clear(self) -> None:
+        self.strokes = []
+        self.size = 0
+        self.lifted = True
+        self.cone = None
+        self.dirty = None
+        self.reset = True
+
+    def add(self, x: float, y: float) -> None:
+        if self.lifted:
+            self.strokes.append((array("d", [x]), array("d", [y])))
+            self.lifted = False
+            self.cone = None
+            self._added(len(self.strokes) - 1, 0)
+            return
+
+        xs, ys = self.strokes[-1]
+        n = len(xs)
+
+        # Try to extend the current segment
+        if self.cone is not None:
+            ref, low, high, last_d = self.cone
+            dx, dy = x - xs[n - 2], y - ys[n - 2]
+            d = hypot(dx, dy)
+            if d >= last_d:
+                angle = (atan2(dy, dx) - ref + pi) % (2 * pi) - pi
+                if low <= angle <= high:
+                    half = asin(min(1, self.tolerance / d))
+                    self.cone = (ref, max(low, angle - half), min(high, angle + half), d)
+                    xs[n - 1] = x
+                    ys[n - 1] = y
+                    self._mark(len(self.strokes) - 1, n - 1)
+                    return
+
+        # Start a new segment from the last point, once the pen moved farther than the tolerance
+        # so that the sub-pixel moves of every physics step do not each add a point
+        dx, dy = x - xs[n - 1], y - ys[n - 1]
+        d = hypot(dx, dy)
+        if d <= self.tolerance: return
+        half = asin(min(1, self.tolerance / d))
+        self.cone = (atan2(dy, dx), -half, half, d)
+        xs.append(x)
+        ys.append(y)
+        self._added(len(self.strokes) - 1, n)
+
+    def _added(self, stroke: int, index: int) -> None:
+        self.size += 1
+        self._mark(stroke, index)
+        if self.size > self.max_points:
+            self.compact()
+
+    # Reduce the trail to at most half of max_points points
+    def compact(self) -> None:
+        tolerance = self.tolerance
+        while self.size > self.max_points // 2 and tolerance < self.tolerance * 64:
+            tolerance *= 2
+            self.strokes = [self._simplify(xs, ys, tolerance) for xs, ys in self.strokes]
+            self.size = sum(len(xs) for xs, _ in self.strokes)
+
+        while self.size > self.max_points // 2:
+            xs, ys = self.strokes[0]
+            excess = self.size - self.max_points // 2
+            if excess >= len(xs) and len(self.strokes) > 1:
+                self.strokes.pop(0)
+            else:
+                excess = min(excess, len(xs) - 1)
+                del xs[:excess]
+                del ys[:excess]
+            self.size = sum(len(xs) for xs, _ in self.strokes)
+
+        self.cone = None
+        self.dirty = (0, 0)
+        self.reset = True
+
+    # Douglas-Peucker simplification of a stroke
+    @staticmethod
+    def _simplify(xs, ys, tolerance: float):
+        n = len(xs)
+        if n <= 2: return xs, ys
+        keep = bytearray(n)
+        keep[0] = keep[n - 1] = 1
+        stack = [(0, n - 1)]
+        while stack:
+            first, last = stack.pop()
+            x1, y1, x2, y2 = xs[first], ys[first], xs[last], ys[last]
+            length = hypot(x2 - x1, y2 - y1)
+            best, best_d = None, tolerance
+            for i in range(first + 1, last):
+                if length == 0:
+                    d = hypot(xs[i] - x1, ys[i] - y1)
+                else:
+                    d = abs((x2 - x1) * (y1 - ys[i]) - (x1 - xs[i]) * (y2 - y1)) / length
+                if d > best_d:
+                    best, best_d = i, d
+            if best is not None:
+                keep[best] = 1
+                stack.append((first, best))
+                stack.append((best, last))
+        return (array("d", (x for x, k in zip(xs, keep) if k)),
+                array("d", (y for y, k in zip(ys, keep) if k)))
+
+
+class Playground:
+    # Scale is in pixels / mm
+    # Physics rate is in Hz, None to step the simulation with the measured wall clock delta
+    # With sim_clock, the emulated program sees the simulated time and the simulation runs time_factor times
+    # faster than the wall clock (as fast as possible if time_factor is None)
+    TIME_FACTORS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, None]
+
+    def __init__(self, width, height, title="Robot playground", scale=1.04, headless=False, physics_rate=None, sim_clock=False, time_factor=None) -> None:
+        self.headless = headless
+        if headless:
+            self.renderer = NullRenderer(width, height, title)
+        else:
+            self.renderer = TurtleRenderer(width, height, title)
         self.fps = 400
         self.ips = 30
         self.interval = 1 / self.fps
         self.image_interval = 1 / self.ips
+        self.frame_count = 0
+        self.frame_time_total = 0 # Wall time spent rendering frames, in seconds
+        self.frame_time_max = 0
+        self.frame_time_last = 0
         self.last_update = None
         self.last_image_update = None
         self.bots = []
+        self.engines = [] # Objects stepping several bots at once, updated after the bots
         self.end = False
         self.scale = scale
-        self.schedules = []
+        self.schedules = deque()
+        self.waiters = [] # [predicate, deadline, event, result, parked] of the user threads blocked in wait_until
+        self.waiters_lock = threading.Lock()
+        self.commands = deque() # (sim time, wall time, function, arguments) posted by the user threads
+        self.loop_thread = threading.get_ident() # Thread stepping the simulation, it never waits for the commands
+        self.command_count = 0
+        self.command_latency_total = 0 # In simulated seconds
+        self.command_latency_max = 0
+        self.command_wall_latency_total = 0 # In wall clock seconds
+        self.command_wall_latency_max = 0
+        self.physics_rate = physics_rate
+        self.max_substeps = 8 # Maximum fixed steps done by one update, to not spiral when a tick is slow
+        self.accumulator = 0
+        self.ticks = 0
+        self.sim_time = 0
+        self.time_limit = None # Simulated seconds after which the playground stops, None for no limit
+        self.event_driven = False # With sim_clock, step from an event to the next instead of every tick
+        self.max_event_step = 1 # Longest step in simulated seconds when event driven
+        self.clock = None
+        if sim_clock:
+            self.clock = SimClock(self)
+            if self.physics_rate is None:
+                self.physics_rate = self.fps
+        self.time_factor = time_factor
+        self.achieved_time_factor = 0
+        self.pace_wall_time = None # Wall and simulated time the pacing is anchored to
+        self.pace_sim_time = 0
+        self.measure_interval = 0.5 # Wall time in seconds between two measures of the achieved time factor
+        self.measure_wall_time = None
+        self.measure_sim_time = 0
+        self.renderer.bind_key("plus", self.faster)
+        self.renderer.bind_key("equal", self.faster)
+        self.renderer.bind_key("minus", self.slower)
+        self.renderer.bind_key("1", lambda: self.set_time_factor(1))
         rw = width  / self.scale
         rh = height / self.scale
         self.rect = (-rw/2, -rh/2, rw/2, rh/2) # Rectangle in mm (x1, y1, x2, y2)
+        self.world = World()
+        self.world.add_box(*self.rect) # Borders of the playground
+        self.floor = None # Floor image seen by the sensors looking down, None for a white floor
 
     def register_bot(self, bot):
         self.bots.append(bot)
 
+    def register_engine(self, engine):
+        self.engines.append(engine)
+
+    def set_floor(self, floor: Floor):
+        self.floor = floor
+        self.renderer.draw_floor(floor, self.scale)
+
     def update(self):
         if self.last_update is None:
             self.last_update = time.perf_counter()
@@ -45,19 +559,207 @@ class Playground:
         delta_time = current_time - self.last_update
         self.last_update = current_time
 
+        if self.physics_rate is None:
+            self.step(delta_time)
+        else:
+            fixed_delta = 1 / self.physics_rate
+            self.accumulator += delta_time
+            substeps = 0
+            while self.accumulator >= fixed_delta and substeps < self.max_substeps:
+                self.step(fixed_delta)
+                self.accumulator -= fixed_delta
+                substeps += 1
+            if self.accumulator >= fixed_delta:
+                self.accumulator = 0 # Too late to catch up, simulated time lags behind wall time
+
+        self.render(current_time)
+
+    # Advance the simulation by delta_time seconds
+    def step(self, delta_time: float):
+        if self.commands:
+            self.apply_commands()
+
         for bot in self.bots:
             bot.update(delta_time)
 
-        for schedule in self.schedules:
-            schedule()
-        self.schedules.clear()
+        for engine in self.engines:
+            engine.update(delta_time)
+
+        schedules = self.schedules
+        while schedules:
+            schedules.popleft()()
+
+        self.ticks += 1
+        self.sim_time += delta_time
+        if self.waiters:
+            self.wake_waiters()
+        if self.time_limit is not None and self.sim_time >= self.time_limit:
+            self.stop()
+        if self.clock is not None:
+            self.clock.wake_due(self.sim_time)
+
+    def set_physics_rate(self, physics_rate):
+        self.physics_rate = physics_rate
+        self.accumulator = 0
+
+    # Set how many simulated seconds elapse per wall clock second, None for unlimited
+    # Only used with the simulation clock, the wall clock stepping always runs in real time
+    def set_time_factor(self, time_factor):
+        if time_factor is not None and time_factor <= 0:
+            raise ValueError("time factor must be positive or None")
+        self.time_factor = time_factor
+        self.pace_wall_time = None
+
+    def _change_time_factor(self, offset: int):
+        factors = self.TIME_FACTORS
+        if self.time_factor in factors:
+            index = factors.index(self.time_factor) + offset
+        else:
+            finite = [f for f in factors if f is not None]
+            index = len([f for f in finite if f < self.time_factor]) - (offset < 0)
+        self.set_time_factor(factors[min(max(index, 0), len(factors) - 1)])
+
+    def faster(self):
+        self._change_time_factor(1)
+
+    def slower(self):
+        self._change_time_factor(-1)
+
+    # Sleep as needed so the simulated time follows the time factor and measure the achieved one
+    def _pace(self):
+        current_time = time.perf_counter()
 
-        if current_time - self.last_image_update > self.image_interval:
-            self.screen.update()
+        if self.measure_wall_time is None:
+            self.measure_wall_time = current_time
+            self.measure_sim_time = self.sim_time
+        elif current_time - self.measure_wall_time >= self.measure_interval:
+            self.achieved_time_factor = (self.sim_time - self.measure_sim_time) / (current_time - self.measure_wall_time)
+            self.measure_wall_time = current_time
+            self.measure_sim_time = self.sim_time
+            self.renderer.set_status("x%s (achieved x%.2f) - %.1f ms/frame" % (
+                "max" if self.time_factor is None else "%g" % self.time_factor, self.achieved_time_factor,
+                self.frame_time_last * 1000))
+
+        if self.time_factor is None:
+            return
+        if self.pace_wall_time is None:
+            self.pace_wall_time = current_time
+            self.pace_sim_time = self.sim_time
+            return
+
+        wait = self.pace_wall_time + (self.sim_time - self.pace_sim_time) / self.time_factor - current_time
+        if wait > 0.001:
+            time.sleep(wait)
+        elif wait < -0.1: # Can not keep up, do not try to catch up later
+            self.pace_wall_time = current_time
+            self.pace_sim_time = self.sim_time
+
+    def stop(self):
+        self.end = True
+
+    # Step the simulation as fast as possible, in lockstep with the threads using the simulation clock
+    def update_sim_clock(self):
+        if not self.clock.wait_parked(self.image_interval):
+            # A program is still running, keep the window alive without advancing the simulated time
+            self.render(time.perf_counter())
+            return
+        if self.end:
+            return # Stopped by a program, do not step past its end
+        while self.commands:
+            self.apply_commands() # The commands may change the next event
+            if not self.waiters:
+                break
+            self.wake_waiters() # The programs reading their own writes continue at the same time
+            if not self.clock.wait_parked(self.image_interval):
+                self.render(time.perf_counter())
+                return
+            if self.end:
+                return # The woken program may have stopped the playground
+        delta_time = 1 / self.physics_rate
+        if self.event_driven:
+            delta_time = max(self.next_event(), delta_time)
+        delta_time = self.next_wake(delta_time) # End the step where a program stops waiting
+        self.step(delta_time)
+        self._pace()
+        self.render(time.perf_counter())
+
+    # Simulated seconds until the next event that changes the simulation by itself (a motor reaching
+    # its target, a sensor sample, a sleeping thread or a wait_until timeout), at most max_event_step
+    # Bots and engines without events are stepped every tick
+    def next_event(self) -> float:
+        delay = self.max_event_step
+        for bot in self.bots:
+            delay = min(delay, bot.next_event())
+        for engine in self.engines:
+            next_event = getattr(engine, "next_event", None)
+            delay = min(delay, 0 if next_event is None else next_event())
+        deadline = self.clock.next_deadline() if self.clock is not None else None
+        if deadline is not None:
+            delay = min(delay, deadline - self.sim_time)
+        with self.waiters_lock:
+            for _, deadline, _, _, _ in self.waiters:
+                if deadline is not None:
+                    delay = min(delay, deadline - self.sim_time)
+        if self.time_limit is not None:
+            delay = min(delay, self.time_limit - self.sim_time)
+        return delay
+
+    # Length of the next step, at most delta_time, so that it ends where a program may stop waiting:
+    # the end of a sleep, a wait_until timeout or a condition waited for becoming true
+    def next_wake(self, delta_time: float) -> float:
+        deadline = self.clock.next_deadline() if self.clock is not None else None
+        if deadline is not None:
+            delta_time = min(delta_time, deadline - self.sim_time)
+        if self.waiters:
+            with self.waiters_lock:
+                for _, deadline, _, _, _ in self.waiters:
+                    if deadline is not None:
+                        delta_time = min(delta_time, deadline - self.sim_time)
+            for bot in self.bots:
+                delta_time = min(delta_time, bot.next_wake(delta_time))
+        return max(delta_time, 0)
+
+    # Set how many frames per second are displayed
+    def set_display_rate(self, ips):
+        self.ips = ips
+        self.image_interval = 1 / ips
+
+    # Redraw the bots that moved and refresh the screen if a frame is due
+    def render(self, current_time: float):
+        if self.renderer.headless:
+            return
+        if self.last_image_update is not None and current_time - self.last_image_update < self.image_interval:
+            return
+        self.last_image_update = current_time
+
+        for bot in self.bots:
+            bot.render()
+        self.renderer.update()
+
+        frame_time = time.perf_counter() - current_time
+        self.frame_count += 1
+        self.frame_time_total += frame_time
+        self.frame_time_max = max(self.frame_time_max, frame_time)
+        self.frame_time_last = frame_time
+
+    # Return the number of frames rendered and the last, mean and max frame time in seconds
+    def frame_stats(self) -> dict:
+        return {
+            "frames": self.frame_count,
+            "last_frame_time": self.frame_time_last,
+            "mean_frame_time": self.frame_time_total / self.frame_count if self.frame_count else 0,
+            "max_frame_time": self.frame_time_max,
+        }
 
     def mainloop(self):
+        self.loop_thread = threading.get_ident()
+        if self.clock is not None:
+            self.clock.install()
         try:
             while not self.end:
+                if self.clock is not None:
+                    self.update_sim_clock()
+                    continue
                 start = time.perf_counter()
                 self.update()
                 end = time.perf_counter()
@@ -65,26 +767,101 @@ class Playground:
                 if wait > 0:
                     time.sleep(wait)
                 start = end
-        except turtle.Terminator:
-            pass
         except Exception as e:
-            if not isinstance(e, tk.TclError):
+            if not isinstance(e, self.renderer.closed_errors): # The window was closed
                 raise e
+        finally:
+            if self.clock is not None:
+                self.clock.uninstall()
+
+    # Called by the devices when they are read, a yield point for a user thread using the simulation clock
+    def before_read(self):
+        if threading.get_ident() == self.loop_thread:
+            return
+        if self.commands:
+            self.wait_until(lambda: not self.commands) # A program reads its own writes
+        if self.clock is not None:
+            self.clock.yield_point()
 
     def run_once(self, func):
         self.schedules.append(func)
 
+    # Block the calling user thread until predicate() is true, which is checked after every tick
+    # Return False if timeout (in simulated seconds) elapsed before
+    def wait_until(self, predicate, timeout: float = None) -> bool:
+        if predicate():
+            return True
+        clock = self.clock if self.clock is not None and self.clock.installed and self.clock.is_emulated() else None
+        deadline = None if timeout is None else self.sim_time + timeout
+        waiter = [predicate, deadline, threading.Event(), False, clock is not None]
+        with self.waiters_lock:
+            self.waiters.append(waiter)
+        if clock is not None:
+            clock.park()
+        if waiter[2].wait(None if clock is not None else timeout):
+            return waiter[3]
+        with self.waiters_lock:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        return waiter[3]
+
+    def wake_waiters(self):
+        with self.waiters_lock:
+            waiting = []
+            for waiter in self.waiters:
+                predicate, deadline, event, _, parked = waiter
+                if predicate():
+                    waiter[3] = True
+                elif deadline is None or self.sim_time < deadline - 1e-9:
+                    waiting.append(waiter)
+                    continue
+                if parked:
+                    self.clock.unpark()
+                event.set()
+            self.waiters = waiting
+
+    # Queue a command from a user thread, it is applied by the simulation thread at the next tick boundary
+    def post(self, func, *args):
+        self.commands.append((self.sim_time, wall_clock(), func, args))
+
+    def apply_commands(self):
+        commands = self.commands
+        current_time = wall_clock()
+        while commands:
+            sim_time, wall_time, func, args = commands.popleft()
+            func(*args)
+            latency = self.sim_time - sim_time
+            wall_latency = current_time - wall_time
+            self.command_count += 1
+            self.command_latency_total += latency
+            self.command_latency_max = max(self.command_latency_max, latency)
+            self.command_wall_latency_total += wall_latency
+            self.command_wall_latency_max = max(self.command_wall_latency_max, wall_latency)
+
+    # Return the number of commands applied and their mean and max latency in simulated and wall clock seconds
+    def command_stats(self) -> dict:
+        count = self.command_count
+        return {
+            "commands": count,
+            "mean_latency": self.command_latency_total / count if count else 0,
+            "max_latency": self.command_latency_max,
+            "mean_wall_latency": self.command_wall_latency_total / count if count else 0,
+            "max_wall_latency": self.command_wall_latency_max,
+        }
+
 
 
 
 class Bot:
+    TELEMETRY_FIELDS = ("x", "y", "heading") # Names of the values returned by telemetry
+
     def __init__(self, playground: Playground, name: str = "Bot") -> None:
         self.playground = playground
         self.scale = playground.scale
 
         self.name = name
         self.shape = None
-        self.turtle = turtle.RawTurtle(self.playground.screen)
+        self.turtle = self.playground.renderer.create_turtle()
         self.turtle.speed(0) # No speed limit
 
         self.x = 0
@@ -92,38 +869,81 @@ class Bot:
         self.heading = 0
 
         self.shape_name = str(uuid.uuid4())
+        self.drawn_pose = None # Pose the bot had when it was last drawn
 
         self.turtle.tiltangle(0)
+        self.turtle.up() # The trail is drawn by the renderer
+        self.turtle.setundobuffer(None)
+
+        self.trail = Trail()
+        self.trail_color = "black"
 
         self.playground.register_bot(self)
 
         self.user_thread: Thread = None
+        self.user_exit: BaseException = None # Exception that ended the user program, None if it returned
 
     def run(self, func):
         if self.user_thread is None:
-            self.user_thread = Thread(target=func, args=[self])
+            clock = self.playground.clock
+            def target(bot):
+                try:
+                    func(bot)
+                except SystemExit as e:
+                    self.user_exit = e
+                except BaseException as e:
+                    self.user_exit = e
+                    raise
+            if clock is not None:
+                target = clock.register_thread(target)
+            # Daemon so a program that never returns does not keep the process alive once the playground ended
+            self.user_thread = Thread(target=target, args=[self], daemon=True)
             self.user_thread.start()
 
     def teleport(self, x, y):
         self.x = x
         self.y = y
-        self.turtle.up()
+        self.trail.lift()
         self.turtle.setposition(self.x, self.y)
-        self.turtle.down()
 
     def build_shape():
         pass # Child class must override this if needed
 
     def update_shape(self):
-        self.build_shape()
-        if self.shape is not None:
-            self.playground.screen.addshape(self.shape_name, self.shape)
-            self.turtle.shape(self.shape_name)
+        self.playground.renderer.add_shape(self)
         self.teleport(self.x, self.y) # Teleport because pen offset may have changed
 
     def update(self, delta_time: float):
         pass # Child class must override this if needed
 
+    # Simulated seconds until the bot changes its motion or a device samples by itself
+    # 0 for a bot that must be stepped every tick
+    def next_event(self) -> float:
+        return 0
+
+    # Simulated seconds, at most horizon, until a condition a program waits for may become true
+    def next_wake(self, horizon: float) -> float:
+        return horizon
+
+    # Position of the pen on the screen, in pixels
+    def pen_position(self) -> tuple:
+        return (self.x * self.scale, self.y * self.scale)
+
+    # Values recorded every tick by a Recorder, named by TELEMETRY_FIELDS
+    def telemetry(self) -> tuple:
+        return (self.x, self.y, self.heading)
+
+    def draw(self):
+        pass # Child class must override this if needed
+
+    # Redraw the bot if it moved since the last frame
+    def render(self):
+        pose = (self.x, self.y, self.heading)
+        if pose != self.drawn_pose:
+            self.drawn_pose = pose
+            self.draw()
+            self.playground.renderer.draw_trail(self.trail, self.trail_color)
+
 
 
 class TwoWheelsBot(Bot):
@@ -154,11 +974,13 @@ class TwoWheelsBot(Bot):
         self.y = y * 10
         new_x = (self.x + sin(self.heading) * self.pen_offset) * self.scale
         new_y = (self.y - cos(self.heading) * self.pen_offset) * self.scale
-        self.turtle.up()
+        self.trail.lift()
+        if not self.playground.renderer.headless:
+            self.trail.add(new_x, new_y)
         self.turtle.setposition(new_x, new_y)
-        self.turtle.down()
 
     def build_shape(self):
+        import turtle
         self.shape = turtle.Shape("compound")
 
         body_left   = -(self.body_width / 2 + self.pen_offset) * self.scale
@@ -228,38 +1050,62 @@ class TwoWheelsBot(Bot):
 
         C_x = -sin(a)
         C_y =  cos(a)
+
+        Computed as the chord of the arc, which does not lose precision when k is small:
+        x' = x + s * sin(k / 2) / (k / 2) * cos(a + k / 2)
+        y' = y + s * sin(k / 2) / (k / 2) * sin(a + k / 2)
         """
 
         k = ((right_delta - left_delta) * pi * self.wheel_diameter / 360) / self.wheels_distance
         s = ((right_delta + left_delta) * pi * self.wheel_diameter / 360) / 2
 
-        heading = self.heading
+        x, y, heading = self.x, self.y, self.heading
+        chord = s * sin(k / 2) / (k / 2) if k != 0 else s
+        middle = heading + k / 2
+        self.x += chord * cos(middle)
+        self.y += chord * sin(middle)
+        self.heading = heading + k
 
+        if not self.playground.renderer.headless and (left_delta != 0 or right_delta != 0):
+            self.add_trail_arc(x, y, heading, s, k)
+
+    # Add the pen positions along the arc of a move to the trail, split so that the chords between
+    # them stay within the trail tolerance even when an event step moves the bot far
+    def add_trail_arc(self, x, y, heading, s, k):
+        pieces = 1
         if k != 0:
-            self.x += ( sin(k + heading) - sin(heading)) / k * s
-            self.y += (-cos(k + heading) + cos(heading)) / k * s
-        else:
-            self.x += cos(heading) * s
-            self.y += sin(heading) * s
-        new_heading = heading + k
+            radius = (abs(s / k) + self.pen_offset) * self.scale # Of the circle followed by the pen, in pixels
+            pieces = ceil(abs(k) / sqrt(8 * self.trail.tolerance / radius))
+        offset = self.pen_offset
+        for i in range(1, pieces):
+            a = k * i / pieces
+            chord = s * i / pieces * sin(a / 2) / (a / 2)
+            pen_heading = heading + a
+            self.trail.add((x + chord * cos(heading + a / 2) + sin(pen_heading) * offset) * self.scale,
+                           (y + chord * sin(heading + a / 2) - cos(pen_heading) * offset) * self.scale)
+        self.trail.add(*self.pen_position())
+
+    def pen_position(self) -> tuple:
+        heading = self.heading
+        return ((self.x + sin(heading) * self.pen_offset) * self.scale,
+                (self.y - cos(heading) * self.pen_offset) * self.scale)
 
-        new_x = (self.x + sin(new_heading) * self.pen_offset) * self.scale
-        new_y = (self.y - cos(new_heading) * self.pen_offset) * self.scale
+    # Move the turtle to the bot position
+    def draw(self):
+        new_x, new_y = self.pen_position()
 
         self.turtle.setposition(new_x, new_y)
-        self.heading = new_heading
-        self.turtle.setheading(degrees(new_heading))
+        self.turtle.setheading(degrees(self.heading))
 
 
 def emulate(pg: Playground, bot: Bot, program_file: str, start_x: float = 0, start_y: float = 0) -> None:
     bot.teleport(0, 0)
 
-    pg.canvas.update()
-    w, h = pg.canvas.winfo_width(), pg.canvas.winfo_height()
+    w, h = pg.renderer.get_size()
     print("Width = %f cm ; Height = %f cm" % (w/pg.scale/10, h/pg.scale/10))
 
     import os
-    library_path = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(__file__), "src/bots/gopigo/libs")))
+    library_path = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(__file__), "bots/gopigo/libs")))
     program_path = os.path.normpath(os.path.abspath(program_file))
     program_dir  = os.path.dirname(program_path)
 
@@ -280,8 +1126,17 @@ def emulate(pg: Playground, bot: Bot, program_file: str, start_x: float = 0, sta
     spec = importlib.util.spec_from_file_location("__main__", program_path, submodule_search_locations=[program_dir])
 
     def main(_):
-        spec.loader.load_module()
-        #pg.run_once(lambda: bot.teleport(1000000, 0))
+        try:
+            spec.loader.load_module()
+            #pg.run_once(lambda: bot.teleport(1000000, 0))
+        finally:
+            if pg.headless and pg.clock is None:
+                pg.stop() # Nobody is watching, end the emulation with the program
+
+    if pg.clock is not None:
+        pg.clock.install() # Before the program starts so it never sees the wall clock
+        if pg.headless:
+            pg.clock.on_exit = pg.stop # Once the program and the threads it started that are not daemons ended
 
     bot.run(main)
 
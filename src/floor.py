@@ -0,0 +1,262 @@
+import mmap
+import struct
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+    numpy_available = True
+except ImportError:
+    numpy_available = False
+
+try:
+    from PIL import Image
+    pil_available = True
+except ImportError:
+    pil_available = False
+
+
+class Floor:
+    """
+    Image printed on the floor of a playground, seen by the sensors looking down.
+
+    The pixels are stored as a contiguous height x width x channels array of bytes (1 channel
+    for gray images, 3 for color ones). The image is centered on the origin of the playground
+    and every pixel covers resolution x resolution mm, rows going from the top (y > 0) to the
+    bottom. Points outside of the image see the background value (white by default).
+    """
+
+    def __init__(self, pixels, resolution: float = 1, background: float = 1) -> None:
+        if not numpy_available:
+            raise ImportError("numpy is needed for Floor")
+
+        pixels = np.asarray(pixels)
+        if pixels.dtype != np.uint8:
+            pixels = np.clip(np.rint(pixels * 255), 0, 255).astype(np.uint8) # Values in [0, 1]
+        if pixels.ndim == 2:
+            pixels = pixels[:, :, None]
+        self.pixels = np.ascontiguousarray(pixels)
+        self.height, self.width, self.channels = self.pixels.shape
+        self.resolution = resolution
+        self.background = background
+
+    @classmethod
+    def load(cls, path: str, resolution: float = 1, background: float = 1):
+        """
+        Load a PGM or PPM image (or any image Pillow can read, e.g. PNG) as a Floor.
+
+        Tiled floor maps are opened as a TiledFloor, with the resolution and the background
+        stored in the file.
+        """
+        with open(path, "rb") as file:
+            if file.read(len(TiledFloor.MAGIC)) == TiledFloor.MAGIC:
+                return TiledFloor(path)
+            file.seek(0)
+            data = file.read()
+        if data[:2] in (b"P2", b"P3", b"P5", b"P6"):
+            return cls(read_pnm(data), resolution, background)
+        if not pil_available:
+            raise ImportError("Pillow is needed to load %s, convert it to PGM or PPM otherwise" % path)
+        image = Image.open(path)
+        image = image.convert("L" if image.mode in ("1", "L", "LA", "I", "I;16", "F") else "RGB")
+        return cls(np.asarray(image), resolution, background)
+
+    def sample(self, points):
+        """
+        Bilinear interpolation of the floor at N points (N x 2 array of x, y in mm).
+
+        Return a N x channels array of values in [0, 1] (0 is black).
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        # Position in pixels, the center of pixel (row, col) being at (col, row)
+        col = points[:, 0] / self.resolution + (self.width / 2 - 0.5)
+        row = (self.height / 2 - 0.5) - points[:, 1] / self.resolution
+
+        col0 = np.floor(col)
+        row0 = np.floor(row)
+        fc = (col - col0)[:, None]
+        fr = (row - row0)[:, None]
+        c0 = np.clip(col0, 0, self.width - 1).astype(np.intp)
+        c1 = np.clip(col0 + 1, 0, self.width - 1).astype(np.intp)
+        r0 = np.clip(row0, 0, self.height - 1).astype(np.intp)
+        r1 = np.clip(row0 + 1, 0, self.height - 1).astype(np.intp)
+
+        gather = self._gather
+        top    = gather(r0, c0) * (1 - fc) + gather(r0, c1) * fc
+        bottom = gather(r1, c0) * (1 - fc) + gather(r1, c1) * fc
+        values = (top * (1 - fr) + bottom * fr) / 255
+
+        outside = (col < -0.5) | (col > self.width - 0.5) | (row < -0.5) | (row > self.height - 0.5)
+        values[outside] = self.background
+        return values
+
+    # Pixels at the given rows and columns, as a N x channels array
+    def _gather(self, rows, cols):
+        return self.pixels[rows, cols]
+
+    def sample_gray(self, points):
+        """Same as sample, with the channels averaged into a single value per point."""
+        values = self.sample(points)
+        return values[:, 0] if self.channels == 1 else values.mean(axis=1)
+
+    def bounds(self):
+        """Rectangle covered by the image in mm (x1, y1, x2, y2)."""
+        w = self.width * self.resolution / 2
+        h = self.height * self.resolution / 2
+        return (-w, -h, w, h)
+
+
+class TiledFloor(Floor):
+    """
+    Floor stored on disk as square tiles, for floors too big to be held in memory.
+
+    The file is opened with mmap and only the tiles under the sampled points are read, so opening
+    a floor takes the same time whatever its size. The last cache_size tiles read are kept in a
+    least recently used cache. Use TiledFloor.write or TiledFloor.convert to create the file.
+
+    File layout: a header of HEADER_SIZE bytes (magic, width, height, channels, tile size,
+    resolution, background) followed by the tiles, row after row of tiles, each one being
+    tile size x tile size x channels bytes (tiles on the edges are padded with the background).
+    """
+
+    MAGIC = b"FLOORMAP"
+    HEADER = struct.Struct("<8sIIIIdd")
+    HEADER_SIZE = 64
+
+    def __init__(self, path: str, cache_size: int = 64) -> None:
+        if not numpy_available:
+            raise ImportError("numpy is needed for TiledFloor")
+
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.channels, self.tile_size, self.resolution, self.background = \
+            self.HEADER.unpack_from(self.map)
+        if magic != self.MAGIC:
+            raise ValueError("%s is not a tiled floor map" % path)
+        self.tiles_x = -(-self.width // self.tile_size)
+        self.tiles_y = -(-self.height // self.tile_size)
+        self.tile_bytes = self.tile_size * self.tile_size * self.channels
+
+        self.cache_size = cache_size
+        self.cache = OrderedDict() # Tile arrays by tile index, least recently used first
+        self.cache_lock = threading.Lock() # Sensors sample the floor from the user threads
+        self.tile_reads = 0
+
+    def close(self) -> None:
+        self.cache.clear()
+        self.map.close()
+        self.file.close()
+
+    def _tile(self, index: int):
+        with self.cache_lock:
+            tile = self.cache.get(index)
+            if tile is not None:
+                self.cache.move_to_end(index)
+                return tile
+            offset = self.HEADER_SIZE + index * self.tile_bytes
+            tile = np.frombuffer(self.map[offset:offset + self.tile_bytes], dtype=np.uint8)
+            tile = tile.reshape(self.tile_size, self.tile_size, self.channels)
+            self.tile_reads += 1
+            self.cache[index] = tile
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return tile
+
+    def _gather(self, rows, cols):
+        ts = self.tile_size
+        indices = (rows // ts) * self.tiles_x + cols // ts
+        if len(rows) == 0: return np.empty((0, self.channels), dtype=np.uint8)
+        first = indices[0]
+        if (indices == first).all():
+            return self._tile(int(first))[rows % ts, cols % ts]
+
+        # Points are usually close to each other, so only a few tiles are touched per call
+        values = np.empty((len(rows), self.channels), dtype=np.uint8)
+        tiles, inverse = np.unique(indices, return_inverse=True)
+        for i, index in enumerate(tiles.tolist()):
+            selected = inverse == i
+            values[selected] = self._tile(index)[rows[selected] % ts, cols[selected] % ts]
+        return values
+
+    @classmethod
+    def write(cls, path: str, pixels, resolution: float = 1, background: float = 1, tile_size: int = 256) -> None:
+        """
+        Write a height x width (x channels) array of bytes as a tiled floor map.
+
+        pixels may be a numpy.memmap, it is read one row of tiles at a time.
+        """
+        if pixels.ndim == 2:
+            pixels = pixels[:, :, None]
+        height, width, channels = pixels.shape
+        tiles_x = -(-width // tile_size)
+        tiles_y = -(-height // tile_size)
+        fill = np.uint8(round(background * 255))
+
+        with open(path, "wb") as file:
+            header = cls.HEADER.pack(cls.MAGIC, width, height, channels, tile_size, resolution, background)
+            file.write(header.ljust(cls.HEADER_SIZE, b"\0"))
+            for ty in range(tiles_y):
+                strip = np.full((tile_size, tiles_x * tile_size, channels), fill, dtype=np.uint8)
+                rows = pixels[ty * tile_size:(ty + 1) * tile_size]
+                strip[:len(rows), :width] = rows
+                # Reorder the strip from rows of pixels to consecutive tiles
+                strip = strip.reshape(tile_size, tiles_x, tile_size, channels).swapaxes(0, 1)
+                file.write(np.ascontiguousarray(strip).tobytes())
+
+    @classmethod
+    def convert(cls, source: str, path: str, resolution: float = 1, background: float = 1, tile_size: int = 256) -> None:
+        """
+        Convert an image to a tiled floor map.
+
+        Binary 8 bits PGM and PPM images are memory-mapped, so they can be bigger than the memory.
+        """
+        with open(source, "rb") as file:
+            head = file.read(1024)
+        if head[:2] in (b"P5", b"P6"):
+            width, height, maxval, offset = read_pnm_header(head)
+            if maxval == 255:
+                channels = 3 if head[:2] == b"P6" else 1
+                pixels = np.memmap(source, dtype=np.uint8, mode="r", offset=offset, shape=(height, width, channels))
+                cls.write(path, pixels, resolution, background, tile_size)
+                return
+        floor = Floor.load(source, resolution, background)
+        cls.write(path, floor.pixels, resolution, background, tile_size)
+
+
+# Width, height, maximum value and offset of the pixels of a PGM or PPM image
+def read_pnm_header(data: bytes):
+    header = []
+    i = 2
+    while len(header) < 3:
+        while data[i:i + 1].isspace():
+            i += 1
+        if data[i:i + 1] == b"#":
+            while data[i:i + 1] not in (b"\n", b"\r", b""):
+                i += 1
+            continue
+        start = i
+        while data[i:i + 1] and not data[i:i + 1].isspace():
+            i += 1
+        if start == i:
+            raise ValueError("Truncated PNM header")
+        header.append(int(data[start:i]))
+    return header[0], header[1], header[2], i + 1
+
+
+# Decode a PGM or PPM (binary or ASCII) image into a height x width (x 3) array of bytes
+def read_pnm(data: bytes):
+    magic = data[:2]
+    width, height, maxval, offset = read_pnm_header(data)
+    channels = 3 if magic in (b"P3", b"P6") else 1
+    count = width * height * channels
+
+    if magic in (b"P5", b"P6"):
+        dtype = np.uint8 if maxval < 256 else np.dtype(">u2")
+        pixels = np.frombuffer(data, dtype, count, offset)
+    else:
+        pixels = np.array(data[offset:].split()[:count], dtype=np.int64)
+    pixels = pixels.reshape(height, width, channels)
+    if maxval != 255:
+        pixels = (pixels.astype(np.float64) * (255 / maxval)).round()
+    pixels = pixels.astype(np.uint8)
+    return pixels[:, :, 0] if channels == 1 else pixels
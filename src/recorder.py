@@ -0,0 +1,278 @@
+import json
+import mmap
+import queue
+import struct
+import threading
+from bisect import bisect_right
+from itertools import chain
+from math import ceil, cos, inf, sin
+
+
+class Recorder:
+    """
+    Record the telemetry of every bot of a playground, every tick, into a compact binary file.
+
+    Every tick, its simulated time (float64) and the values of Bot.telemetry() of every bot
+    (float32) are packed as one row into a preallocated chunk of chunk_size rows. Full chunks are
+    handed to a background thread that writes them to the file and gives them back: at most
+    buffers chunks exist at any time, so the memory used does not depend on the length of the run.
+
+    File layout: MAGIC, the length of the JSON header (uint32) and the JSON header (bots names,
+    fields of each bot, chunk size and row format), then the chunks, each one being the number
+    of rows it holds (uint32) followed by the rows. Everything is little-endian.
+    """
+
+    MAGIC = b"EMUREC01"
+    CHUNK_HEADER = struct.Struct("<I")
+
+    def __init__(self, playground, path: str, chunk_size: int = 4096, buffers: int = 4) -> None:
+        self.playground = playground
+        self.path = path
+        self.chunk_size = chunk_size
+        self.bots = list(playground.bots)
+        self.fields = [list(bot.TELEMETRY_FIELDS) for bot in self.bots]
+        self.width = sum(len(fields) for fields in self.fields) # Values per row
+        self.row = struct.Struct("<d%if" % self.width)
+        self.row_size = self.row.size
+        self.pack_into = self.row.pack_into
+        self.telemetry = self.bots[0].telemetry if len(self.bots) == 1 else self._telemetry
+
+        self.file = open(path, "wb")
+        header = json.dumps({
+            "bots": [bot.name for bot in self.bots],
+            "fields": self.fields,
+            "chunk_size": chunk_size,
+            "row_format": self.row.format,
+            "physics_rate": playground.physics_rate,
+        }).encode()
+        self.file.write(self.MAGIC + struct.pack("<I", len(header)) + header)
+
+        # Chunks ready to be filled, and chunks waiting to be written with their number of rows
+        self.free = queue.Queue()
+        for _ in range(buffers):
+            self.free.put(bytearray(self.row.size * chunk_size))
+        self.full = queue.Queue()
+        self.buffer = self.free.get()
+        self.count = 0
+        self.ticks = 0 # Rows already handed to the writer
+        self.closed = False
+
+        self.writer = threading.Thread(target=self._write_chunks, daemon=True)
+        self.writer.start()
+        playground.register_engine(self)
+
+    # Called by the playground after the bots moved, so the recorded time is the end of the tick
+    def update(self, delta_time: float) -> None:
+        if self.closed: return
+        count = self.count
+        self.pack_into(self.buffer, count * self.row_size, self.playground.sim_time + delta_time, *self.telemetry())
+        self.count = count + 1
+        if count + 1 == self.chunk_size:
+            self._flush()
+
+    # Rows are recorded at whatever steps the playground makes
+    def next_event(self) -> float:
+        return inf
+
+    # Values of every bot for one row
+    def _telemetry(self) -> tuple:
+        return tuple(chain.from_iterable(bot.telemetry() for bot in self.bots))
+
+    def _flush(self) -> None:
+        self.ticks += self.count
+        self.full.put((self.count, self.buffer))
+        self.buffer = self.free.get() # Waits for the writer when every buffer is in use
+        self.count = 0
+
+    def _write_chunks(self) -> None:
+        while True:
+            chunk = self.full.get()
+            if chunk is None: break
+            count, buffer = chunk
+            self.file.write(self.CHUNK_HEADER.pack(count))
+            self.file.write(memoryview(buffer)[:count * self.row.size])
+            self.free.put(buffer)
+
+    def close(self) -> None:
+        """Write the ticks recorded so far and close the file."""
+        if self.closed: return
+        self.closed = True
+        if self in self.playground.engines:
+            self.playground.engines.remove(self)
+        if self.count > 0:
+            self._flush()
+        self.full.put(None)
+        self.writer.join()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Recording:
+    """
+    Read a file written by a Recorder.
+
+    The chunk headers are read once at opening to build a keyframe index (time, row and offset of
+    the first row of every chunk), so finding the row of a given time is a binary search over the
+    chunks followed by one inside a chunk, and reading a row does not depend on the file size.
+    A file whose last chunk was not completely written (e.g. after a crash) is read up to it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(Recorder.MAGIC)] != Recorder.MAGIC:
+            raise ValueError("%s is not a recording" % path)
+        offset = len(Recorder.MAGIC)
+        (length,) = struct.unpack_from("<I", self.map, offset)
+        offset += 4
+        self.header = json.loads(self.map[offset:offset + length])
+        offset += length
+        self.bots = self.header["bots"]
+        self.fields = self.header["fields"]
+        self.row = struct.Struct(self.header["row_format"])
+        self.time_format = struct.Struct("<d")
+
+        # Index of the first column of every bot in a row, after the time
+        self.columns = []
+        column = 1
+        for fields in self.fields:
+            self.columns.append(column)
+            column += len(fields)
+
+        # Keyframe index
+        self.chunk_rows = []
+        self.chunk_offsets = []
+        self.chunk_times = []
+        self.size = 0
+        chunk_header = Recorder.CHUNK_HEADER
+        while offset + chunk_header.size <= len(self.map):
+            (count,) = chunk_header.unpack_from(self.map, offset)
+            offset += chunk_header.size
+            count = min(count, (len(self.map) - offset) // self.row.size)
+            if count == 0: break
+            self.chunk_rows.append(self.size)
+            self.chunk_offsets.append(offset)
+            self.chunk_times.append(self.time_format.unpack_from(self.map, offset)[0])
+            self.size += count
+            offset += count * self.row.size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def close(self) -> None:
+        self.map.close()
+        self.file.close()
+
+    def _offset(self, index: int) -> int:
+        chunk = bisect_right(self.chunk_rows, index) - 1
+        return self.chunk_offsets[chunk] + (index - self.chunk_rows[chunk]) * self.row.size
+
+    def get_row(self, index: int) -> tuple:
+        """Values of the row index: its time followed by the values of every bot."""
+        return self.row.unpack_from(self.map, self._offset(index))
+
+    def get_time(self, index: int) -> float:
+        return self.time_format.unpack_from(self.map, self._offset(index))[0]
+
+    def duration(self) -> float:
+        return self.get_time(self.size - 1) if self.size > 0 else 0
+
+    def find(self, time: float) -> int:
+        """Index of the last row recorded at or before time (0 if time is before the first row)."""
+        chunk = bisect_right(self.chunk_times, time) - 1
+        if chunk < 0: return 0
+        low = self.chunk_rows[chunk]
+        high = self.chunk_rows[chunk + 1] if chunk + 1 < len(self.chunk_rows) else self.size
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self.get_time(middle) <= time:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def get_values(self, row: tuple, bot: int) -> dict:
+        """Values of the given bot in a row, by field name."""
+        column = self.columns[bot]
+        return dict(zip(self.fields[bot], row[column:column + len(self.fields[bot])]))
+
+
+class Replay:
+    """
+    Play a recording back in a playground, moving the given bots (one per recorded bot) without
+    running any program.
+
+    Every tick of the playground advances the replay time and moves the bots to the pose of the
+    last row recorded before it, drawing the pen trail through every row in between. seek jumps
+    to any time with a binary search in the keyframe index, and rebuilds the trails from at most
+    max_trail_rows rows taken evenly before it.
+    """
+
+    def __init__(self, playground, recording: Recording, bots: list) -> None:
+        self.playground = playground
+        self.recording = recording
+        self.bots = bots
+        self.time = 0
+        self.index = 0 # Row the bots are at
+        self.paused = False
+        self.max_trail_rows = 20000
+
+        # Columns of the pose of every bot in a row
+        self.poses = []
+        for bot, fields in enumerate(recording.fields):
+            column = recording.columns[bot]
+            self.poses.append(tuple(column + fields.index(name) for name in ("x", "y", "heading")))
+
+        playground.register_engine(self)
+        playground.renderer.bind_key("space", self.toggle_pause)
+        playground.renderer.bind_key("Left", lambda: self.seek(self.time - 10))
+        playground.renderer.bind_key("Right", lambda: self.seek(self.time + 10))
+        self.seek(0)
+
+    def toggle_pause(self) -> None:
+        self.paused = not self.paused
+        self._set_status()
+
+    # Move the bots to a row, adding their pen position to the trails when trail is True
+    def _move(self, row: tuple, trail: bool) -> None:
+        for bot, (x, y, heading) in zip(self.bots, self.poses):
+            bot.x, bot.y, bot.heading = row[x], row[y], row[heading]
+            if trail:
+                bot.trail.add(*bot.pen_position())
+
+    def seek(self, time: float) -> None:
+        recording = self.recording
+        self.time = min(max(time, 0), recording.duration())
+        self.index = recording.find(self.time)
+        for bot in self.bots:
+            bot.trail.clear()
+        if len(recording) == 0: return
+        step = max(1, ceil(self.index / self.max_trail_rows))
+        for index in range(0, self.index, step):
+            self._move(recording.get_row(index), True)
+        self._move(recording.get_row(self.index), True)
+        self._set_status()
+
+    def _set_status(self) -> None:
+        self.playground.renderer.set_status("Replay %.1f / %.1f s%s" % (
+            self.time, self.recording.duration(), " (paused)" if self.paused else ""))
+
+    def update(self, delta_time: float) -> None:
+        if self.paused or len(self.recording) == 0: return
+        recording = self.recording
+        self.time += delta_time
+        last = len(recording) - 1
+        while self.index < last and recording.get_time(self.index + 1) <= self.time:
+            self.index += 1
+            self._move(recording.get_row(self.index), True)
+        if self.index == last:
+            if self.playground.renderer.headless:
+                self.playground.stop()
+            else:
+                self.paused = True # Keep the end of the run on screen
+                self._set_status()
@@ -0,0 +1,274 @@
+from math import floor, inf, sqrt
+
+try:
+    import numpy as np
+    numpy_available = True
+except ImportError:
+    numpy_available = False
+
+
+class World:
+    """
+    Static obstacles of a playground (walls, boxes, polygons and circles), in mm.
+
+    Obstacles are stored as segments and circles indexed in a uniform grid of cell_size mm
+    cells, so a raycast only tests the obstacles of the cells the ray goes through.
+    version is incremented each time the obstacles change.
+    """
+
+    def __init__(self, cell_size: float = 100) -> None:
+        self.cell_size = cell_size
+        self.clear()
+
+    def clear(self) -> None:
+        self.shapes = [] # (x1, y1, x2, y2) for a segment or (x, y, radius) for a circle
+        self.cells = {}  # Shape ids by (cell x, cell y)
+        self.bounds = None # (min cell x, min cell y, max cell x, max cell y) of the occupied cells
+        self.arrays = None # (version, segment ids, segments, circle ids, circles) used by raycast_many
+        self.version = getattr(self, "version", 0) + 1
+
+    def _add_to_cell(self, cell, shape_id: int) -> None:
+        self.cells.setdefault(cell, []).append(shape_id)
+        cx, cy = cell
+        if self.bounds is None:
+            self.bounds = (cx, cy, cx, cy)
+        else:
+            x1, y1, x2, y2 = self.bounds
+            self.bounds = (min(x1, cx), min(y1, cy), max(x2, cx), max(y2, cy))
+
+    def add_wall(self, x1: float, y1: float, x2: float, y2: float) -> int:
+        shape_id = len(self.shapes)
+        self.shapes.append((x1, y1, x2, y2))
+        length = sqrt((x2 - x1)**2 + (y2 - y1)**2)
+        if length == 0:
+            self._add_to_cell((floor(x1 / self.cell_size), floor(y1 / self.cell_size)), shape_id)
+        else:
+            for cell, _, _ in self._traverse(x1, y1, (x2 - x1) / length, (y2 - y1) / length, length):
+                self._add_to_cell(cell, shape_id)
+        self.version += 1
+        return shape_id
+
+    def add_polygon(self, points, closed: bool = True) -> list:
+        count = len(points) if closed else len(points) - 1
+        return [self.add_wall(*points[i], *points[(i + 1) % len(points)]) for i in range(count)]
+
+    def add_box(self, x1: float, y1: float, x2: float, y2: float) -> list:
+        return self.add_polygon([(x1, y1), (x2, y1), (x2, y2), (x1, y2)])
+
+    def add_circle(self, x: float, y: float, radius: float) -> int:
+        shape_id = len(self.shapes)
+        self.shapes.append((x, y, radius))
+        cs = self.cell_size
+        for cx in range(floor((x - radius) / cs), floor((x + radius) / cs) + 1):
+            for cy in range(floor((y - radius) / cs), floor((y + radius) / cs) + 1):
+                self._add_to_cell((cx, cy), shape_id)
+        self.version += 1
+        return shape_id
+
+    # Cells crossed by the ray (x, y) + t * (dx, dy) for t in [0, max_distance], with their t range
+    def _traverse(self, x: float, y: float, dx: float, dy: float, max_distance: float):
+        cs = self.cell_size
+        cx, cy = floor(x / cs), floor(y / cs)
+        if dx > 0:
+            step_x, t_max_x, t_delta_x = 1, ((cx + 1) * cs - x) / dx, cs / dx
+        elif dx < 0:
+            step_x, t_max_x, t_delta_x = -1, (cx * cs - x) / dx, -cs / dx
+        else:
+            step_x, t_max_x, t_delta_x = 0, inf, inf
+        if dy > 0:
+            step_y, t_max_y, t_delta_y = 1, ((cy + 1) * cs - y) / dy, cs / dy
+        elif dy < 0:
+            step_y, t_max_y, t_delta_y = -1, (cy * cs - y) / dy, -cs / dy
+        else:
+            step_y, t_max_y, t_delta_y = 0, inf, inf
+
+        t = 0
+        while t <= max_distance:
+            if t_max_x < t_max_y:
+                yield (cx, cy), t, t_max_x
+                t = t_max_x
+                cx += step_x
+                t_max_x += t_delta_x
+            else:
+                yield (cx, cy), t, t_max_y
+                t = t_max_y
+                cy += step_y
+                t_max_y += t_delta_y
+
+    @staticmethod
+    def intersection(x, y, dx, dy, shape) -> float:
+        """
+        Distance along the ray (x, y) + k * (dx, dy), with (dx, dy) normalized, to the shape or -1.
+
+        Segment (x1, y1) + t * (idx, idy), t in [0, 1]:
+        x + k * dx = x1 + t * idx
+        y + k * dy = y1 + t * idy
+
+        With a = dx * idy - dy * idx (0 when parallel):
+        k = ((x1 - x) * idy - (y1 - y) * idx) / a
+        t = ((x1 - x) * dy  - (y1 - y) * dx)  / a
+
+        Circle of center (cx, cy) and radius r, with (ox, oy) = (x - cx, y - cy):
+        k^2 + 2 * k * (ox * dx + oy * dy) + ox^2 + oy^2 - r^2 = 0
+        """
+        if len(shape) == 4:
+            x1, y1, x2, y2 = shape
+            idx = x2 - x1
+            idy = y2 - y1
+            a = dx * idy - dy * idx
+            if a == 0: return -1
+            ox = x1 - x
+            oy = y1 - y
+            k = (ox * idy - oy * idx) / a
+            t = (ox * dy - oy * dx) / a
+            if k < 0 or t < 0 or t > 1: return -1
+            return k
+
+        cx, cy, r = shape
+        ox = x - cx
+        oy = y - cy
+        b = ox * dx + oy * dy
+        c = ox * ox + oy * oy - r * r
+        delta = b * b - c
+        if delta < 0: return -1
+        root = sqrt(delta)
+        k = -b - root
+        if k < 0: k = -b + root # Inside the circle
+        return k if k >= 0 else -1
+
+    def raycast(self, x: float, y: float, dx: float, dy: float, max_distance: float = inf):
+        """
+        Cast a ray from (x, y) in the direction (dx, dy).
+
+        Return the distance in mm to the first obstacle hit and its shape id, or (inf, None).
+        """
+        if self.bounds is None: return inf, None
+        norm = sqrt(dx * dx + dy * dy)
+        dx /= norm
+        dy /= norm
+
+        # Clip the ray to the occupied cells so it does not walk through empty space forever
+        cs = self.cell_size
+        bx1, by1, bx2, by2 = self.bounds
+        t_enter, t_exit = 0, max_distance
+        for o, d, low, high in ((x, dx, bx1 * cs, (bx2 + 1) * cs), (y, dy, by1 * cs, (by2 + 1) * cs)):
+            if d == 0:
+                if o < low or o > high: return inf, None
+            else:
+                t1 = (low - o) / d
+                t2 = (high - o) / d
+                if t1 > t2: t1, t2 = t2, t1
+                t_enter = max(t_enter, t1)
+                t_exit = min(t_exit, t2)
+        if t_enter > t_exit: return inf, None
+
+        shapes = self.shapes
+        cells = self.cells
+        intersection = self.intersection
+        tested = set()
+        best_d, best_id = inf, None
+        for cell, _, cell_exit in self._traverse(x + dx * t_enter, y + dy * t_enter, dx, dy, t_exit - t_enter):
+            ids = cells.get(cell)
+            if ids is not None:
+                for shape_id in ids:
+                    if shape_id in tested: continue
+                    tested.add(shape_id)
+                    d = intersection(x, y, dx, dy, shapes[shape_id])
+                    if 0 <= d < best_d:
+                        best_d, best_id = d, shape_id
+            if best_d <= t_enter + cell_exit:
+                break # Nothing in the next cells can be closer
+
+        if best_d > max_distance: return inf, None
+        return best_d, best_id
+
+    def _get_arrays(self):
+        if self.arrays is None or self.arrays[0] != self.version:
+            segment_ids = [i for i, shape in enumerate(self.shapes) if len(shape) == 4]
+            circle_ids = [i for i, shape in enumerate(self.shapes) if len(shape) == 3]
+            self.arrays = (
+                self.version,
+                np.array(segment_ids, dtype=np.int64),
+                np.array([self.shapes[i] for i in segment_ids], dtype=np.float64).reshape(-1, 4),
+                np.array(circle_ids, dtype=np.int64),
+                np.array([self.shapes[i] for i in circle_ids], dtype=np.float64).reshape(-1, 3))
+        return self.arrays[1:]
+
+    def raycast_many(self, origins, directions, max_distance: float = inf, chunk_size: int = 1 << 20):
+        """
+        Cast N rays at once, from origins (N x 2 array) in directions (N x 2 array), with NumPy.
+
+        Return the distances in mm (inf when nothing is hit), the shape ids (-1 when nothing is
+        hit) and the hit points (NaN when nothing is hit) as arrays of N, N and N x 2 elements.
+        Rays are tested against every obstacle in reach, chunk_size ray-obstacle pairs at a time.
+        """
+        if not numpy_available:
+            raise ImportError("numpy is needed for World.raycast_many")
+
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        directions = np.array(directions, dtype=np.float64).reshape(-1, 2)
+        directions /= np.hypot(directions[:, 0], directions[:, 1])[:, None]
+        n = len(origins)
+
+        best_d = np.full(n, inf)
+        best_id = np.full(n, -1, dtype=np.int64)
+        segment_ids, segments, circle_ids, circles = self._get_arrays()
+
+        # Only keep the obstacles in reach of a ray
+        if n > 0 and max_distance != inf:
+            low = origins.min(axis=0) - max_distance
+            high = origins.max(axis=0) + max_distance
+            keep = ((np.minimum(segments[:, 0], segments[:, 2]) <= high[0]) & (np.maximum(segments[:, 0], segments[:, 2]) >= low[0]) &
+                    (np.minimum(segments[:, 1], segments[:, 3]) <= high[1]) & (np.maximum(segments[:, 1], segments[:, 3]) >= low[1]))
+            segment_ids, segments = segment_ids[keep], segments[keep]
+            keep = ((circles[:, 0] + circles[:, 2] >= low[0]) & (circles[:, 0] - circles[:, 2] <= high[0]) &
+                    (circles[:, 1] + circles[:, 2] >= low[1]) & (circles[:, 1] - circles[:, 2] <= high[1]))
+            circle_ids, circles = circle_ids[keep], circles[keep]
+
+        for ids, shapes, intersect in ((segment_ids, segments, self._intersect_segments),
+                                       (circle_ids, circles, self._intersect_circles)):
+            if len(shapes) == 0: continue
+            rays_per_chunk = max(1, chunk_size // len(shapes))
+            for start in range(0, n, rays_per_chunk):
+                end = min(start + rays_per_chunk, n)
+                d = intersect(origins[start:end], directions[start:end], shapes)
+                nearest = np.argmin(d, axis=1)
+                nearest_d = d[np.arange(end - start), nearest]
+                closer = nearest_d < best_d[start:end]
+                best_d[start:end][closer] = nearest_d[closer]
+                best_id[start:end][closer] = ids[nearest[closer]]
+
+        missed = (best_d > max_distance) | np.isinf(best_d) # Nothing hit when max_distance is inf
+        best_d[missed] = inf
+        best_id[missed] = -1
+        hits = origins + directions * np.where(missed, np.nan, best_d)[:, None]
+        return best_d, best_id, hits
+
+    # Distance of every ray to every segment (inf when missed), same equations as intersection
+    @staticmethod
+    def _intersect_segments(origins, directions, segments):
+        x, y = origins[:, 0:1], origins[:, 1:2]
+        dx, dy = directions[:, 0:1], directions[:, 1:2]
+        x1, y1 = segments[:, 0], segments[:, 1]
+        idx = segments[:, 2] - x1
+        idy = segments[:, 3] - y1
+        ox = x1 - x
+        oy = y1 - y
+        a = dx * idy - dy * idx
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k = (ox * idy - oy * idx) / a
+            t = (ox * dy - oy * dx) / a
+        hit = (a != 0) & (k >= 0) & (t >= 0) & (t <= 1)
+        return np.where(hit, k, inf)
+
+    # Distance of every ray to every circle (inf when missed), same equations as intersection
+    @staticmethod
+    def _intersect_circles(origins, directions, circles):
+        ox = origins[:, 0:1] - circles[:, 0]
+        oy = origins[:, 1:2] - circles[:, 1]
+        b = ox * directions[:, 0:1] + oy * directions[:, 1:2]
+        c = ox * ox + oy * oy - circles[:, 2] ** 2
+        delta = b * b - c
+        root = np.sqrt(np.maximum(delta, 0))
+        k = np.where(-b - root >= 0, -b - root, -b + root)
+        return np.where((delta >= 0) & (k >= 0), k, inf)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The emulator is imported as the src package, from the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
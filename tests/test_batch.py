@@ -0,0 +1,18 @@
+from src.bots.gopigo.batch import make_jobs, run_batch
+
+
+PROGRAM = """
+import os
+print("pid", os.getpid())
+"""
+
+
+def test_every_job_runs_in_a_fresh_process(tmp_path):
+    program = tmp_path / "program.py"
+    program.write_text(PROGRAM)
+    results = run_batch(make_jobs([program] * 4, time_limit=1), max_workers=2)
+    pids = set()
+    for result in results:
+        assert result["status"] == "ok", result["output"]
+        pids.update(line.split()[1] for line in result["output"].splitlines() if line.startswith("pid"))
+    assert len(pids) == 4
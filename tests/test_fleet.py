@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.emu import Playground
+from src.bots.gopigo.gopigo import GoPiGoBot
+from src.bots.gopigo.fleet import GoPiGoFleet
+
+
+def error(a, b):
+    return max(
+        abs(a.x - b.x), abs(a.y - b.y), abs(a.heading - b.heading),
+        abs(a.left_motor.encoder - b.left_motor.encoder), abs(a.right_motor.encoder - b.right_motor.encoder),
+        abs(a.left_motor.velocity - b.left_motor.velocity), abs(a.right_motor.velocity - b.right_motor.velocity),
+    )
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_fleet_matches_scalar_motors(seed):
+    rng = random.Random(seed)
+    pg = Playground(800, 800, headless=True, physics_rate=100)
+    fleet = GoPiGoFleet(pg, 4)
+    pairs = [(GoPiGoBot(pg), fleet.add_bot()) for _ in range(40)]
+    for _ in range(1500):
+        for scalar, vector in pairs:
+            if rng.random() < 0.02:
+                # One draw for both bots, so they get the same command
+                side, kind, value = rng.randrange(2), rng.randrange(5), rng.uniform(-800, 800)
+                power = rng.choice((-128, int(value / 6)))
+                for bot in (scalar, vector):
+                    motor = (bot.left_motor, bot.right_motor)[side]
+                    if kind == 0:
+                        motor.set_dps(value)
+                    elif kind == 1:
+                        motor.set_position(motor.encoder + value)
+                    elif kind == 2:
+                        motor.set_limits(abs(value))
+                    elif kind == 3:
+                        motor.set_position(motor.encoder)
+                    else:
+                        motor.set_power(power)
+        pg.step(rng.choice((0.01, 0.05, 0.001)))
+    assert max(error(a, b) for a, b in pairs) < 1e-11
+
+
+def test_fleet_draws_the_pen_trail():
+    pg = Playground(800, 800, headless=True, physics_rate=100)
+    pg.renderer.headless = False # Trails are only recorded when there is a window to draw them
+    fleet = GoPiGoFleet(pg, 2)
+    scalar, vector = GoPiGoBot(pg), fleet.add_bot()
+    for bot in (scalar, vector):
+        bot.left_motor.set_limits(1000)
+        bot.right_motor.set_limits(1000)
+        bot.left_motor.set_dps(300)
+        bot.right_motor.set_dps(100)
+    for _ in range(200):
+        pg.step(0.01)
+    assert vector.trail.size > 2
+    assert vector.trail.size == scalar.trail.size
+    for (xs, ys), (expected_xs, expected_ys) in zip(vector.trail.strokes, scalar.trail.strokes):
+        assert list(xs) == pytest.approx(list(expected_xs), abs=1e-9)
+        assert list(ys) == pytest.approx(list(expected_ys), abs=1e-9)
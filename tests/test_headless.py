@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAM = """
+from easygopigo3 import EasyGoPiGo3
+gpg = EasyGoPiGo3()
+gpg.drive_cm(10)
+"""
+
+# Run a job in a Python where tkinter and turtle can not be imported
+RUNNER = """
+import sys
+sys.modules["tkinter"] = None
+sys.modules["turtle"] = None
+from src.bots.gopigo.batch import make_jobs, run_job
+result = run_job(make_jobs([sys.argv[1]], time_limit=10)[0])
+print(result["status"], result["x"])
+"""
+
+
+def test_headless_runs_without_tk(tmp_path):
+    program = tmp_path / "program.py"
+    program.write_text(PROGRAM)
+    process = subprocess.run([sys.executable, "-c", RUNNER, str(program)], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert process.returncode == 0, process.stderr
+    status, x = process.stdout.split()
+    assert status == "ok"
+    assert float(x) > 90
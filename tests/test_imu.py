@@ -0,0 +1,40 @@
+from math import atan2, degrees
+
+import pytest
+
+from src.emu import Playground
+from src.bots.gopigo.gopigo import GoPiGoBot
+
+
+def yaw(quaternion):
+    x, y, z, w = quaternion
+    assert x == z == 0 # Only a rotation around the vertical y axis of the sensor
+    return 2 * atan2(y, w)
+
+
+# Angle in degrees brought between -180 and 180
+def wrapped(angle):
+    return (angle + 180) % 360 - 180
+
+
+def test_quaternion_follows_the_gyroscope_and_the_compass():
+    pg = Playground(800, 800, headless=True, physics_rate=100)
+    bot = GoPiGoBot(pg)
+    bot.left_motor.set_limits(1000)
+    bot.right_motor.set_limits(1000)
+    bot.left_motor.set_dps(-200)
+    bot.right_motor.set_dps(300)
+    bot.imu.start()
+    for _ in range(3):
+        pg.step(0.01)
+    start = yaw(bot.imu.read_quaternion())
+    turned = 0
+    for _ in range(300):
+        pg.step(0.01)
+        turned += bot.imu.read_gyroscope()[1] * 0.01
+        angle = yaw(bot.imu.read_quaternion())
+        # The gyroscope turns the quaternion, an angle known modulo a turn
+        assert wrapped(degrees(angle - start) - turned) == pytest.approx(0, abs=1e-6)
+        # The compass heading is clockwise from the north, the quaternion counterclockwise
+        assert wrapped(bot.imu.read_euler()[0] + degrees(angle)) == pytest.approx(0, abs=1e-6)
+    assert abs(turned) > 360
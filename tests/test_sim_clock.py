@@ -0,0 +1,67 @@
+import pytest
+
+from src.bots.gopigo.batch import make_jobs, run_batch
+
+
+PROGRAM = """
+from easygopigo3 import EasyGoPiGo3
+gpg = EasyGoPiGo3()
+gpg.drive_cm(20)
+gpg.turn_degrees(90)
+gpg.drive_cm(10)
+print(gpg.read_encoders())
+"""
+
+THREADS = """
+import threading, time
+from easygopigo3 import EasyGoPiGo3
+gpg = EasyGoPiGo3()
+start = time.monotonic()
+def background(name, times):
+    for _ in range(times):
+        time.sleep(0.1)
+        print("%s %.6f" % (name, time.monotonic() - start))
+threading.Thread(target=background, args=["short", 5]).start()
+threading.Thread(target=background, args=["daemon", 100], daemon=True).start()
+gpg.drive_cm(20)
+print("main %.6f" % (time.monotonic() - start))
+"""
+
+
+def run(tmp_path, source, event_driven=False, rates=(50, 400)):
+    program = tmp_path / "program.py"
+    program.write_text(source)
+    jobs = make_jobs([program], [{"physics_rate": rate} for rate in rates], time_limit=30)
+    jobs += make_jobs([program], [{"physics_rate": rates[-1]}], time_limit=30, event_driven=True)
+    results = run_batch(jobs)
+    for result in results:
+        assert result["status"] == "ok", result["output"]
+    return results
+
+
+def test_result_does_not_depend_on_the_physics_rate(tmp_path):
+    results = run(tmp_path, PROGRAM)
+    reference = results[0]
+    for result in results[1:]:
+        for key in ("heading", "left_encoder", "right_encoder", "sim_time"):
+            assert result[key] == pytest.approx(reference[key], rel=1e-9, abs=1e-9), key
+        # Each step integrates the pose along an arc, exact only while the wheel speed ratio is constant
+        assert result["x"] == pytest.approx(reference["x"], abs=1e-3)
+        assert result["y"] == pytest.approx(reference["y"], abs=1e-3)
+
+
+def test_threads_started_by_the_program_use_the_simulation_clock(tmp_path):
+    results = run(tmp_path, THREADS)
+    for result in results:
+        times = {}
+        for line in result["output"].splitlines():
+            name, _, value = line.partition(" ")
+            if name in ("short", "daemon", "main"):
+                times.setdefault(name, []).append(float(value))
+        assert times["short"] == pytest.approx([0.1, 0.2, 0.3, 0.4, 0.5])
+        # The run ends once the main thread and the thread that is not a daemon ended
+        end = max(times["main"][0], 0.5)
+        assert result["sim_time"] == pytest.approx(end, abs=1e-6)
+        assert times["daemon"] == pytest.approx([0.1 * (i + 1) for i in range(len(times["daemon"]))])
+        assert times["daemon"][-1] <= end + 1e-6
+        assert result["x"] == pytest.approx(results[0]["x"], abs=1e-9)
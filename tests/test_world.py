@@ -0,0 +1,76 @@
+import random
+from math import cos, inf, sin, pi
+
+import pytest
+
+from src.world import World
+
+
+def make_world(seed: int, walls: int = 5000, circles: int = 200):
+    rng = random.Random(seed)
+    world = World()
+    for _ in range(walls):
+        x, y = rng.uniform(-5000, 5000), rng.uniform(-5000, 5000)
+        length, angle = rng.uniform(0, 400), rng.uniform(0, 2 * pi)
+        world.add_wall(x, y, x + length * cos(angle), y + length * sin(angle))
+    for _ in range(circles):
+        world.add_circle(rng.uniform(-5000, 5000), rng.uniform(-5000, 5000), rng.uniform(1, 150))
+    return world
+
+
+def random_rays(seed: int, count: int):
+    rng = random.Random(seed)
+    rays = []
+    for _ in range(count):
+        angle = rng.uniform(0, 2 * pi)
+        # Some rays start outside of the obstacles and some are axis aligned, the edge cases of the grid
+        if rng.random() < 0.1:
+            angle = rng.choice((0, pi / 2, pi, 3 * pi / 2))
+        rays.append((rng.uniform(-6000, 6000), rng.uniform(-6000, 6000), cos(angle), sin(angle)))
+    return rays
+
+
+# Nearest hit by testing every obstacle
+def brute_force(world: World, x, y, dx, dy, max_distance=inf):
+    best, best_id = inf, None
+    for shape_id, shape in enumerate(world.shapes):
+        d = World.intersection(x, y, dx, dy, shape)
+        if 0 <= d < best:
+            best, best_id = d, shape_id
+    if best > max_distance:
+        return inf, None
+    return best, best_id
+
+
+@pytest.mark.parametrize("max_distance", [inf, 800])
+def test_raycast_matches_brute_force(max_distance):
+    world = make_world(1)
+    for x, y, dx, dy in random_rays(2, 1000):
+        d, shape_id = world.raycast(x, y, dx, dy, max_distance)
+        expected, expected_id = brute_force(world, x, y, dx, dy, max_distance)
+        assert d == pytest.approx(expected, rel=1e-12, abs=1e-9)
+        if shape_id != expected_id: # Only possible for two obstacles at the same distance
+            assert World.intersection(x, y, dx, dy, world.shapes[shape_id]) == pytest.approx(expected)
+
+
+def test_raycast_empty_world():
+    assert World().raycast(0, 0, 1, 0) == (inf, None)
+
+
+@pytest.mark.parametrize("max_distance", [inf, 800])
+def test_raycast_many_matches_raycast(max_distance):
+    np = pytest.importorskip("numpy")
+    world = make_world(3, walls=1000, circles=50)
+    rays = random_rays(4, 500)
+    origins = np.array([ray[:2] for ray in rays])
+    directions = np.array([ray[2:] for ray in rays])
+    with np.errstate(all="raise"):
+        distances, ids, hits = world.raycast_many(origins, directions, max_distance)
+    for i, (x, y, dx, dy) in enumerate(rays):
+        d, shape_id = world.raycast(x, y, dx, dy, max_distance)
+        if shape_id is None:
+            assert distances[i] == inf and ids[i] == -1
+            assert np.isnan(hits[i]).all()
+        else:
+            assert distances[i] == pytest.approx(d, rel=1e-9)
+            assert hits[i] == pytest.approx((x + dx * d, y + dy * d))